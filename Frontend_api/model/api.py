@@ -1,14 +1,33 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, g
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import os
 import json
 import tempfile
+import shutil
 import io
-import matplotlib.pyplot as plt
-from mall_segmentation import MallCustomerSegmentation
+from mall_segmentation import MallCustomerSegmentation, columns_to_records
+from schema import ColumnRoles
+from synthetic import generate_customers
+from instrumentation import instrumentation
+from resources import fit_resources
+import time
+import threading
+from collections import OrderedDict
+from silhouette import DEFAULT_SAMPLE_SIZE
+from engines import DEFAULT_ENGINE, DEFAULT_ALGORITHM, DEFAULT_INIT, DEFAULT_PRECISION
+from sweep import sweep_k, MAX_SWEEP_K
+from batch import expand_grid, run_batch
+from artifacts import load_artifact
+from registry import ModelRegistry
+from ingest import ingest_upload, save_stats
+from column_cache import build_column_cache
+from plotting import render_segments, PLOT_FORMATS, DEFAULT_DENSITY_THRESHOLD
+from jobs import JobManager, SUCCEEDED
+from export import iter_frames, available_columns, export_dtypes, csv_stream, parquet_stream, gzip_stream, DEFAULT_EXPORT_CHUNK_ROWS
 import base64
+import uuid
 from werkzeug.utils import secure_filename
 
 
@@ -16,12 +35,43 @@ from werkzeug.utils import secure_filename
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Create data directory if it doesn't exist
+# Create data directories if they don't exist
 os.makedirs('data', exist_ok=True)
+MODEL_DIR = os.path.join('data', 'models')
+DATASET_DIR = os.path.join('data', 'datasets')
+SAMPLE_DATA_FILE = os.path.join('data', 'mall_customers.csv')
+os.makedirs(MODEL_DIR, exist_ok=True)
+os.makedirs(DATASET_DIR, exist_ok=True)
 
-# Global variables
-current_model = None
-current_data_file = None
+# Uploaded datasets and fitted models, looked up by id
+registry = ModelRegistry(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 8)),
+    max_bytes=int(os.environ.get('MODEL_MEMORY_BUDGET_MB', 1024)) * 2 ** 20
+)
+# Saved artifacts opened by /api/predict and the customer lookups; the least recently used is closed first
+loaded_artifacts = OrderedDict()
+loaded_artifacts_lock = threading.Lock()
+MAX_LOADED_ARTIFACTS = int(os.environ.get('ARTIFACT_CACHE_SIZE', 16))
+# Saved models (artifacts plus the labelled CSVs of streaming runs) are deleted oldest first beyond this budget
+MODEL_DISK_BUDGET = int(os.environ.get('MODEL_DISK_BUDGET_MB', 10240)) * 2 ** 20
+saved_models_lock = threading.Lock()
+job_manager = JobManager(max_workers=int(os.environ.get('JOB_WORKERS', 2)))
+
+# Largest number of ids one /api/customers/lookup request may carry
+MAX_LOOKUP_IDS = 100000
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    # Streamed bodies are still being produced at this point; this is the time to the first byte
+    if 'request_start' in g:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        instrumentation.observe_request(endpoint, request.method, response.status_code,
+                                        time.perf_counter() - g.request_start)
+    return response
 
 @app.route('/')
 def home():
@@ -30,304 +80,1036 @@ def home():
 
 @app.route('/api/upload', methods=['POST'])
 def upload_data():
-    global current_data_file
+    # Raw CSV bodies are streamed straight from the request; multipart uploads from the file part
+    if request.mimetype == 'text/csv':
+        stream = request.stream
+        filename = secure_filename(request.args.get('filename', 'upload.csv'))
+    else:
+        if 'file' not in request.files:
+            return jsonify({"error": "No file part"}), 400
+            
+        file = request.files['file']
+        
+        if file.filename == '':
+            return jsonify({"error": "No selected file"}), 400
+            
+        stream = file.stream
+        filename = secure_filename(file.filename)
+        
+    # Write, hash and profile the upload in a single pass
+    upload_path = os.path.join(DATASET_DIR, f'.{uuid.uuid4().hex}_{filename}')
+    try:
+        with instrumentation.stage('ingest'):
+            ingest = ingest_upload(stream, upload_path)
+    except Exception as e:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+        return jsonify({"error": f"Error processing file: {str(e)}"}), 400
+        
+    # Store uploads by content hash so concurrent uploads never overwrite each other
+    digest = ingest.pop("digest")
+    dataset_id = digest[:16]
+    file_path = os.path.join(DATASET_DIR, f'{dataset_id}.csv')
+    os.replace(upload_path, file_path)
+    save_stats(file_path, ingest)
+    registry.add_dataset(dataset_id, file_path, digest=digest)
+    
+    # Convert to binary columns once so later loads skip CSV parsing
+    try:
+        with instrumentation.stage('column_cache'):
+            build_column_cache(file_path, ingest)
+    except Exception:
+        pass  # The CSV remains usable without the cache
     
-    if 'file' not in request.files:
-        return jsonify({"error": "No file part"}), 400
+    # Validate the header
+    columns = ingest["columns"]
+    required_columns = ['Annual Income (k$)', 'Spending Score (1-100)']
+    
+    # Check if the required columns exist or if there are columns with similar names
+    roles = ColumnRoles.resolve(columns)
+    
+    if (not all(col in columns for col in required_columns) and 
+        (roles.income is None or roles.spending is None)):
+        return jsonify({
+            "warning": "File is missing recommended columns. Expected 'Annual Income (k$)' and 'Spending Score (1-100)'.",
+            "columns": columns,
+            "datasetId": dataset_id,
+            "rows": ingest["rows"],
+            "dtypes": ingest["dtypes"],
+            "stats": ingest["stats"],
+            "success": True
+        }), 200
         
-    file = request.files['file']
+    return jsonify({
+        "success": True,
+        "message": "File uploaded successfully",
+        "datasetId": dataset_id,
+        "rows": ingest["rows"],
+        "columns": columns,
+        "dtypes": ingest["dtypes"],
+        "stats": ingest["stats"]
+    })
+
+def response_format_key(columnar, timings=False):
+    response_format = 'columnar' if columnar else 'records'
+    return response_format + '-timings' if timings else response_format
+
+def serialized_body(entry, columnar, timings=False):
+    """JSON results for a fit, serialized once per format and kept on the registry entry
+    
+    With timings, modelInfo also carries the per-stage wall/CPU/memory breakdown of the fit.
+    """
+    response_format = response_format_key(columnar, timings)
+    if response_format not in entry.bodies:
+        results = entry.model.get_results(columnar=columnar)
+        results["modelInfo"]["modelId"] = entry.id
+        if timings:
+            results["modelInfo"]["timings"] = {stage: dict(values) for stage, values in entry.model.timings.items()}
+        with instrumentation.stage('serialize', entry.model.timings):
+            entry.add_body(response_format, app.json.dumps(results).encode('utf-8'))
+    return entry.bodies[response_format]
+
+def cached_response(entry, columnar, timings=False):
+    """JSON results for a cached fit, sent with an ETag"""
+    etag = entry.etag(response_format_key(columnar, timings))
     
-    if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+    # The client already has this exact result
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
         
-    if file:
-        filename = secure_filename(file.filename)
-        file_path = os.path.join('data', filename)
-        file.save(file_path)
-        current_data_file = file_path
+    response = app.response_class(serialized_body(entry, columnar, timings), mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def resolve_data_file(dataset_id=None):
+    """Path of a dataset by id, else of the latest upload, else of the sample dataset"""
+    if dataset_id:
+        file_path = registry.dataset_path(dataset_id) or os.path.join(DATASET_DIR, f'{secure_filename(dataset_id)}.csv')
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Dataset not found: {dataset_id}")
+        return file_path
         
-        # Validate the file
-        try:
-            df = pd.read_csv(file_path)
-            required_columns = ['Annual Income (k$)', 'Spending Score (1-100)']
-            
-            # Check if the required columns exist or if there are columns with similar names
-            income_col = next((col for col in df.columns if 'income' in col.lower()), None)
-            spending_col = next((col for col in df.columns if 'spend' in col.lower()), None)
-            
-            if (not all(col in df.columns for col in required_columns) and 
-                (income_col is None or spending_col is None)):
-                return jsonify({
-                    "warning": "File is missing recommended columns. Expected 'Annual Income (k$)' and 'Spending Score (1-100)'.",
-                    "columns": df.columns.tolist(),
-                    "success": True
-                }), 200
+    file_path = registry.dataset_path()
+    if file_path is not None:
+        return file_path
+        
+    # If no data file has been uploaded, use the sample data
+    if not os.path.exists(SAMPLE_DATA_FILE):
+        create_sample_data(SAMPLE_DATA_FILE)
+        
+    return SAMPLE_DATA_FILE
+
+def resolve_model(model_id=None):
+    """Registry entry for a model id (or the latest model), refitting from its saved parameters if evicted"""
+    entry = registry.get(model_id)
+    if entry is not None or not model_id:
+        return entry
+        
+    # Models fitted by another worker or evicted from memory are rebuilt from their manifest
+    manifest_path = os.path.join(MODEL_DIR, secure_filename(model_id), 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+        
+    # Updated models are the base fit with each appended batch replayed in order
+    params = dict(manifest['params'])
+    updates = params.pop('updates', [])
+    entry = execute_run_model(params, data_file=manifest['dataFile'])
+    for update in updates:
+        entry, _ = apply_update(entry, update['file'], update['sizeThreshold'], update['inertiaThreshold'])
+    return entry
+
+def model_not_found(model_id):
+    if model_id:
+        return jsonify({"error": f"Model not found: {model_id}"}), 404
+    return jsonify({"error": "No model has been run yet"}), 400
+
+def parse_threads(value):
+    """Optional per-fit thread count from a request, clamped to the CPUs available"""
+    if value is None or value == '':
+        return None
+    threads = int(value)
+    if threads < 1:
+        raise ValueError("threads must be at least 1")
+    return fit_resources.resolve_threads(threads)
+
+def model_params(data):
+    """Run parameters of a request with defaults filled in; the model id is a hash of these"""
+    algorithm = data.get('algorithm', DEFAULT_ALGORITHM)
+    sample_size = data.get('sampleSize')
+    streaming = algorithm == 'minibatch'
+    return {
+        "clusters": data.get('clusters', 5),
+        "maxIterations": data.get('maxIterations', 300),
+        "algorithm": algorithm,
+        "randomState": data.get('randomState', 42),
+        "normalize": data.get('normalize', True),
+        "features": data.get('features', None),
+        "silhouetteSampleSize": data.get('silhouetteSampleSize', DEFAULT_SAMPLE_SIZE),
+        "chunkSize": data.get('chunkSize', 100000) if streaming else None,
+        "passes": data.get('passes', 1) if streaming else None,
+        "engine": data.get('engine', DEFAULT_ENGINE) if not streaming else None,
+        "init": data.get('init', DEFAULT_INIT) if not streaming else None,
+        "precision": data.get('precision', DEFAULT_PRECISION) if not streaming else None,
+        "sampleSize": sample_size if not streaming else None,
+        "sampleMethod": data.get('sampleMethod', 'coreset') if sample_size and not streaming else None
+    }
+
+def build_model(params, threads=None):
+    """Unfitted model for a set of run parameters"""
+    return MallCustomerSegmentation(
+        n_clusters=params['clusters'],
+        random_state=params['randomState'],
+        max_iter=params['maxIterations'],
+        algorithm=params['algorithm'],
+        normalize=params['normalize'],
+        silhouette_sample_size=params['silhouetteSampleSize'],
+        n_threads=threads,
+        engine=params['engine'] or DEFAULT_ENGINE,
+        init=params['init'] or DEFAULT_INIT,
+        precision=params['precision'] or DEFAULT_PRECISION,
+        sample_size=params['sampleSize'],
+        sample_method=params['sampleMethod'] or 'coreset'
+    )
+
+def register_model(model_id, model, params, data_file):
+    """Add a fitted model to the registry and persist its pipeline"""
+    entry = registry.put(model_id, model, params, data_file)
+    
+    # Persist the fitted pipeline so /api/predict and other workers can use it
+    model.save_model(os.path.join(MODEL_DIR, model_id), metadata={"params": params, "dataFile": data_file})
+    with loaded_artifacts_lock:
+        loaded_artifacts.pop(model_id, None)
+    
+    # Saving built the customer index, so the entry grew
+    entry.refresh()
+    prune_saved_models()
+    return entry
+
+def saved_model_bytes(model_id):
+    """Disk space of a saved model: its artifact directory and, for streaming runs, its labelled CSV"""
+    path = os.path.join(MODEL_DIR, model_id)
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    labels_path = os.path.join('data', f'segmented_{model_id}.csv')
+    if os.path.exists(labels_path):
+        size += os.path.getsize(labels_path)
+    return size
+
+def prune_saved_models():
+    """Delete the least recently saved models beyond MODEL_DISK_BUDGET, keeping every model held in memory
+    
+    A deleted model takes its labelled CSV and the appended batches no remaining model replays with it;
+    its id then answers 404 like any unknown id.
+    """
+    with saved_models_lock:
+        saved = []
+        for model_id in os.listdir(MODEL_DIR):
+            # Directories still being written end in .tmp
+            manifest_path = os.path.join(MODEL_DIR, model_id, 'manifest.json')
+            if not model_id.endswith('.tmp') and os.path.exists(manifest_path):
+                saved.append((os.path.getmtime(manifest_path), model_id, manifest_path))
+        saved.sort(reverse=True)
+        
+        in_memory = set(registry.model_ids())
+        kept_bytes = 0
+        kept_updates, pruned_updates = set(), set()
+        for _, model_id, manifest_path in saved:
+            try:
+                with open(manifest_path) as f:
+                    updates = {update['file'] for update in json.load(f).get('params', {}).get('updates', [])}
+                size = saved_model_bytes(model_id)
+            except FileNotFoundError:
+                # Replaced by a concurrent save of the same id, which is newer than anything here
+                continue
+            if model_id in in_memory or kept_bytes + size <= MODEL_DISK_BUDGET:
+                kept_bytes += size
+                kept_updates |= updates
+                continue
                 
-            return jsonify({
-                "success": True,
-                "message": "File uploaded successfully",
-                "rows": len(df),
-                "columns": df.columns.tolist()
-            })
-            
-        except Exception as e:
-            return jsonify({"error": f"Error processing file: {str(e)}"}), 400
+            shutil.rmtree(os.path.join(MODEL_DIR, model_id), ignore_errors=True)
+            labels_path = os.path.join('data', f'segmented_{model_id}.csv')
+            if os.path.exists(labels_path):
+                os.remove(labels_path)
+            with loaded_artifacts_lock:
+                loaded_artifacts.pop(model_id, None)
+            pruned_updates |= updates
             
-    return jsonify({"error": "Unknown error"}), 400
+        for delta_file in pruned_updates - kept_updates:
+            if os.path.exists(delta_file):
+                os.remove(delta_file)
+
+def execute_run_model(data, progress=None, data_file=None):
+    """Fit (or fetch from the registry) the model described by the run-model parameters"""
+    progress = progress or (lambda **kwargs: None)
+    
+    # Get parameters from request
+    params = model_params(data)
+    threads = parse_threads(data.get('threads'))
+    features = params['features']
+    
+    data_file = data_file or resolve_data_file(data.get('datasetId'))
+    
+    # Reuse an earlier fit of the same data with the same parameters
+    model_id = registry.make_key(data_file, params)
+    entry = registry.get(model_id)
+    
+    if entry is None:
+        # Initialize and run the model
+        model = build_model(params, threads)
+        
+        # Mini-batch runs stream the file instead of loading it into memory
+        if params['algorithm'] == 'minibatch':
+            progress(stage='streaming fit')
+            labels_path = os.path.join('data', f'segmented_{model_id}.csv')
+            model.fit_streaming(data_file, chunk_size=params['chunkSize'], features=features,
+                                n_passes=params['passes'], output_path=labels_path)
+        else:
+            progress(stage='loading data')
+            model.load_data(data_file, features=features)
+            progress(stage='fitting')
+            model.fit(features=features)
+            progress(stage='fitted', iterations=int(model.model.n_iter_))
+        entry = register_model(model_id, model, params, data_file)
+        
+    registry.mark_latest(entry)
+    return entry
+
+def apply_update(entry, delta_file, size_threshold, inertia_threshold):
+    """Append the rows in delta_file to a fitted model, registering the result under a new id
+    
+    The update runs on a copy, so concurrent updates of the same base, and requests still
+    reading the base, never see a half-applied update.
+    """
+    model = entry.model.copy()
+    report = model.partial_update(pd.read_csv(delta_file), size_threshold=size_threshold,
+                                  inertia_threshold=inertia_threshold)
+    
+    # The updated model replaces its base in memory; the base can still be rebuilt from its manifest
+    update = {"file": delta_file, "sizeThreshold": size_threshold, "inertiaThreshold": inertia_threshold}
+    params = dict(entry.params, updates=entry.params.get('updates', []) + [update])
+    model_id = registry.make_key(delta_file, {"base": entry.id, **update})
+    registry.discard(entry.id)
+    entry = registry.put(model_id, model, params, entry.data_file)
+    registry.mark_latest(entry)
+    
+    model.save_model(os.path.join(MODEL_DIR, model_id), metadata={"params": params, "dataFile": entry.data_file})
+    with loaded_artifacts_lock:
+        loaded_artifacts.pop(model_id, None)
+    entry.refresh()
+    prune_saved_models()
+    return entry, report
 
 @app.route('/api/run-model', methods=['POST'])
 def run_model():
-    global current_model, current_data_file
-    
     try:
-        # Get parameters from request
         data = request.json
-        n_clusters = data.get('clusters', 5)
-        max_iterations = data.get('maxIterations', 300)
-        algorithm = data.get('algorithm', 'auto')
-        random_state = data.get('randomState', 42)
-        normalize = data.get('normalize', True)
-        features = data.get('features', None)
-        
-        # If no data file has been uploaded, use the sample data
-        if current_data_file is None:
-            current_data_file = 'data/mall_customers.csv'
-            
-            # If sample data doesn't exist, create it
-            if not os.path.exists(current_data_file):
-                create_sample_data(current_data_file)
-        
-        # Initialize and run the model
-        model = MallCustomerSegmentation(
-            n_clusters=n_clusters,
-            random_state=random_state,
-            max_iter=max_iterations,
-            algorithm=algorithm,
-            normalize=normalize
-        )
-        
-        model.load_data(current_data_file)
-        model.fit(features=features)
-        current_model = model
+        entry = execute_run_model(data)
         
         # Get results
-        results = model.get_results()
+        columnar = data.get('format', 'records') == 'columnar'
+        return cached_response(entry, columnar, timings=bool(data.get('timings', False)))
+        
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
         
-        return jsonify(results)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
     except Exception as e:
         return jsonify({"error": f"Error running model: {str(e)}"}), 500
 
 @app.route('/api/segmentation', methods=['GET'])
 def get_segmentation():
-    global current_model
+    model_id = request.args.get('modelId')
+    ndjson = request.args.get('format') == 'ndjson'
+    chunk_rows = request.args.get('chunkSize', 10000, type=int)
     
-    if current_model is None:
-        return jsonify({"error": "No model has been run yet"}), 400
+    if ndjson and chunk_rows < 1:
+        return jsonify({"error": "chunkSize must be positive"}), 400
         
     try:
-        results = current_model.get_results()
-        return jsonify(results)
+        entry = resolve_model(model_id)
+        if entry is None:
+            return model_not_found(model_id)
+            
+        # NDJSON streams one customer per line, serialized chunk by chunk; anything that can fail
+        # is checked here, because once the stream has started the status can no longer change
+        if ndjson:
+            if entry.model.df is None:
+                return jsonify({"error": "NDJSON results are not available for streaming (minibatch) runs"}), 400
+            cluster = request.args.get('cluster', None, type=int)
+            return Response(ndjson_customers(entry.model, cluster, chunk_rows), mimetype='application/x-ndjson')
+            
+        columnar = request.args.get('format', 'records') == 'columnar'
+        timings = request.args.get('timings', 'false').lower() == 'true'
+        return cached_response(entry, columnar, timings=timings)
     except Exception as e:
         return jsonify({"error": f"Error getting segmentation results: {str(e)}"}), 500
 
+def ndjson_customers(model, cluster, chunk_rows):
+    """Generate NDJSON lines for the customers of a fitted model"""
+    for chunk in model.iter_customer_chunks(chunk_rows=chunk_rows, cluster=cluster):
+        yield ''.join(json.dumps(record) + '\n' for record in columns_to_records(chunk))
+
+@app.route('/api/segmentation/customers', methods=['GET'])
+def get_customers_page():
+    model_id = request.args.get('modelId')
+    cluster = request.args.get('cluster', None, type=int)
+    limit = request.args.get('limit', 1000, type=int)
+    columnar = request.args.get('format', 'records') == 'columnar'
+    
+    # The cursor is the row index to resume from, returned as nextCursor by the previous page
+    try:
+        cursor = int(request.args.get('cursor') or 0)
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    if not (1 <= limit <= 10000):
+        return jsonify({"error": "limit must be between 1 and 10000"}), 400
+        
+    try:
+        entry = resolve_model(model_id)
+        if entry is None:
+            return model_not_found(model_id)
+        model = entry.model
+        if model.df is None:
+            return jsonify({"error": "Customer pages are not available for streaming (minibatch) runs"}), 400
+            
+        rows = model.cluster_rows(cluster)
+        entry.refresh()
+        position = int(np.searchsorted(rows, cursor))
+        page = rows[position:position + limit]
+        customers = model.customer_columns(page)
+        next_position = position + limit
+        
+        return jsonify({
+            "customers": customers if columnar else columns_to_records(customers),
+            "nextCursor": str(rows[next_position]) if next_position < len(rows) else None,
+            "total": int(len(rows)),
+            "modelId": entry.id
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({"error": f"Error getting customers: {str(e)}"}), 500
+
 @app.route('/api/export-csv', methods=['GET'])
 def export_csv():
-    global current_model
+    model_id = request.args.get('modelId')
+    export_format = request.args.get('format', 'csv')
+    compression = request.args.get('compression')
+    cluster = request.args.get('cluster', None, type=int)
+    chunk_rows = request.args.get('chunkSize', DEFAULT_EXPORT_CHUNK_ROWS, type=int)
+    columns = request.args.get('columns')
+    
+    if export_format not in ('csv', 'parquet'):
+        return jsonify({"error": "format must be 'csv' or 'parquet'"}), 400
+    if compression not in (None, 'gzip'):
+        return jsonify({"error": "compression must be 'gzip'"}), 400
+    if chunk_rows < 1:
+        return jsonify({"error": "chunkSize must be positive"}), 400
+    if export_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "Parquet export requires pyarrow"}), 400
     
-    if current_model is None:
-        return jsonify({"error": "No model has been run yet"}), 400
-        
     try:
-        # Get the dataframe with cluster assignments
-        df = current_model.df
-        
-        # Create a CSV string
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        
-        # Create a response with the CSV file
-        response = app.response_class(
-            csv_buffer.getvalue(),
-            mimetype='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=customer_segments.csv'}
-        )
+        entry = resolve_model(model_id)
+        if entry is None:
+            return model_not_found(model_id)
+        model = entry.model
         
-        return response
+        # Validate the requested columns against what the model holds
+        if columns:
+            columns = [col.strip() for col in columns.split(',') if col.strip()]
+            unknown = [col for col in columns if col not in available_columns(model)]
+            if unknown:
+                return jsonify({"error": f"Unknown columns: {', '.join(unknown)}"}), 400
+        else:
+            columns = None
+        
+        frames = iter_frames(model, columns=columns, cluster=cluster, chunk_rows=chunk_rows)
+        if export_format == 'parquet':
+            body = parquet_stream(frames, export_dtypes(model, columns))
+            mimetype = 'application/vnd.apache.parquet'
+            filename = 'customer_segments.parquet'
+        else:
+            body = csv_stream(frames)
+            mimetype = 'text/csv'
+            filename = 'customer_segments.csv'
+        
+        headers = {}
+        if compression == 'gzip':
+            body = gzip_stream(body)
+            if export_format == 'csv':
+                mimetype = 'application/gzip'
+                filename += '.gz'
+            else:
+                headers['Content-Encoding'] = 'gzip'
+        headers['Content-Disposition'] = f'attachment; filename={filename}'
+        
+        # Rows are encoded chunk by chunk as the client reads them
+        return Response(body, mimetype=mimetype, headers=headers)
         
     except Exception as e:
         return jsonify({"error": f"Error exporting CSV: {str(e)}"}), 500
 
 @app.route('/api/export-plot', methods=['GET'])
 def export_plot():
-    global current_model
+    model_id = request.args.get('modelId')
+    
+    # Rendering options
+    fmt = request.args.get('format', 'png').lower()
+    dpi = request.args.get('dpi', 300, type=int)
+    width = request.args.get('width', 10, type=float)
+    height = request.args.get('height', 8, type=float)
+    density_threshold = request.args.get('densityThreshold', DEFAULT_DENSITY_THRESHOLD, type=int)
     
-    if current_model is None:
-        return jsonify({"error": "No model has been run yet"}), 400
+    if fmt not in PLOT_FORMATS:
+        return jsonify({"error": f"Unsupported format. Expected one of {list(PLOT_FORMATS)}"}), 400
+    if not (50 <= dpi <= 600) or not (2 <= width <= 30) or not (2 <= height <= 30):
+        return jsonify({"error": "dpi must be 50-600 and width/height 2-30 inches"}), 400
         
     try:
-        # Create a plot
-        plt.figure(figsize=(10, 8))
-        
-        # Get the dataframe with cluster assignments
-        df = current_model.df
+        entry = resolve_model(model_id)
+        if entry is None:
+            return model_not_found(model_id)
+        model = entry.model
         
-        # Determine column names
-        if 'Annual Income (k$)' in df.columns:
-            income_col = 'Annual Income (k$)'
-        else:
-            income_col = next((col for col in df.columns if 'income' in col.lower()), None)
+        if model.df is None:
+            return jsonify({"error": "Plot export is not available for streaming (minibatch) runs"}), 400
             
-        if 'Spending Score (1-100)' in df.columns:
-            spending_col = 'Spending Score (1-100)'
-        else:
-            spending_col = next((col for col in df.columns if 'spend' in col.lower()), None)
-        
-        # Plot each cluster
-        for i in range(current_model.n_clusters):
-            cluster_data = df[df['Cluster'] == i]
-            plt.scatter(
-                cluster_data[income_col],
-                cluster_data[spending_col],
-                s=100,
-                label=f'Cluster {i+1}'
-            )
+        # Rendered images are cached per fitted model and option set
+        plot_key = (fmt, dpi, width, height, density_threshold)
+        image = entry.get_plot(plot_key)
+        if image is None:
+            # Get the dataframe with cluster assignments
+            df = model.df
+            income_col, spending_col = model.roles.income, model.roles.spending
             
-        # Plot centroids
-        centroids = current_model.model.cluster_centers_
-        if current_model.normalize:
-            centroids = current_model.scaler.inverse_transform(centroids)
+            # Centroids in original units
+            centroids = model.model.cluster_centers_
+            if model.normalize:
+                centroids = model.scaler.inverse_transform(centroids)
+                
+            with instrumentation.stage('render_plot', model.timings):
+                image = entry.add_plot(plot_key, render_segments(
+                    df[income_col].to_numpy(dtype=float),
+                    df[spending_col].to_numpy(dtype=float),
+                    df['Cluster'].to_numpy(),
+                    centroids,
+                    income_col,
+                    spending_col,
+                    model.n_clusters,
+                    fmt=fmt,
+                    dpi=dpi,
+                    width=width,
+                    height=height,
+                    density_threshold=density_threshold
+                ))
             
-        plt.scatter(
-            centroids[:, 0],
-            centroids[:, 1],
-            s=300,
-            c='black',
-            marker='*',
-            label='Centroids'
-        )
-        
-        plt.title('Customer Segments', fontsize=16)
-        plt.xlabel(income_col, fontsize=14)
-        plt.ylabel(spending_col, fontsize=14)
-        plt.legend()
-        plt.grid(True, linestyle='--', alpha=0.7)
-        
-        # Save plot to a bytes buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
-        buf.seek(0)
-        
         # Create a response with the image
         return send_file(
-            buf,
-            mimetype='image/png',
+            io.BytesIO(image),
+            mimetype=PLOT_FORMATS[fmt],
             as_attachment=True,
-            download_name='customer_segments.png'
+            download_name=f'customer_segments.{fmt}'
         )
         
     except Exception as e:
         return jsonify({"error": f"Error exporting plot: {str(e)}"}), 500
 
-@app.route('/api/optimal-k', methods=['GET'])
-def find_optimal_k():
-    global current_data_file
+@app.route('/api/points', methods=['GET'])
+def get_points():
+    model_id = request.args.get('modelId')
+    budget = request.args.get('budget', 2000, type=int)
+    mode = request.args.get('mode', 'sample')
+    bbox = request.args.get('bbox')
     
+    if mode not in ('sample', 'grid'):
+        return jsonify({"error": "mode must be 'sample' or 'grid'"}), 400
+    if not (1 <= budget <= 100000):
+        return jsonify({"error": "budget must be between 1 and 100000"}), 400
+        
+    try:
+        bbox = [float(value) for value in bbox.split(',')] if bbox else None
+    except ValueError:
+        return jsonify({"error": "bbox must be comma-separated numbers"}), 400
+    if bbox is not None and len(bbox) not in (4, 6):
+        return jsonify({"error": "bbox takes 4 values (income/spending) or 6 (with age)"}), 400
+        
     try:
-        # If no data file has been uploaded, use the sample data
-        if current_data_file is None:
-            current_data_file = 'data/mall_customers.csv'
+        entry = resolve_model(model_id)
+        if entry is None:
+            return model_not_found(model_id)
             
-            # If sample data doesn't exist, create it
-            if not os.path.exists(current_data_file):
-                create_sample_data(current_data_file)
-                
-        # Load the data
-        model = MallCustomerSegmentation()
-        model.load_data(current_data_file)
-        X = model.preprocess_data()
-        
-        # Calculate inertia and silhouette scores for different k values
-        k_values = range(2, 11)
-        inertia_values = []
-        silhouette_values = []
-        
-        for k in k_values:
-            kmeans = MallCustomerSegmentation(n_clusters=k)
-            kmeans.load_data(current_data_file)
-            kmeans.fit()
+        points = entry.model.get_points(budget=budget, mode=mode, bbox=bbox)
+        entry.refresh()
+        return jsonify(points)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({"error": f"Error getting points: {str(e)}"}), 500
+
+def get_artifact(name):
+    """Load a saved model artifact by name, keeping the most recently used ones open for later requests"""
+    name = secure_filename(name)
+    with loaded_artifacts_lock:
+        artifact = loaded_artifacts.get(name)
+        if artifact is not None:
+            loaded_artifacts.move_to_end(name)
+            return artifact
+            
+    artifact = load_artifact(os.path.join(MODEL_DIR, name))
+    with loaded_artifacts_lock:
+        loaded_artifacts[name] = artifact
+        while len(loaded_artifacts) > MAX_LOADED_ARTIFACTS:
+            loaded_artifacts.popitem(last=False)
+    return artifact
+
+@app.route('/api/predict', methods=['POST'])
+def predict():
+    model_id = request.args.get('modelId') or registry.latest_model_id
+    if model_id is None:
+        return model_not_found(None)
+        
+    try:
+        artifact = get_artifact(model_id)
+    except FileNotFoundError:
+        return model_not_found(model_id)
+        
+    try:
+        # Rows arrive as a CSV body, a JSON list of objects or JSON parallel columns
+        if request.mimetype == 'text/csv':
+            df = pd.read_csv(io.BytesIO(request.get_data()), usecols=artifact.features)
+        else:
+            rows = request.json.get('rows') if isinstance(request.json, dict) else request.json
+            df = pd.DataFrame(rows)
             
-            inertia_values.append(kmeans.model.inertia_)
+        missing = [feature for feature in artifact.features if feature not in df.columns]
+        if missing:
+            return jsonify({"error": f"Missing feature columns: {missing}"}), 400
             
-            # Calculate silhouette score if there's more than one cluster
-            if k > 1:
-                silhouette_values.append(
-                    float(silhouette_score(X, kmeans.df['Cluster']))
-                )
-            else:
-                silhouette_values.append(0)
-                
-        # Find the optimal k using the elbow method
-        # Calculate the rate of change in inertia
-        inertia_changes = [inertia_values[i-1] - inertia_values[i] for i in range(1, len(inertia_values))]
-        normalized_changes = [change / inertia_values[0] for change in inertia_changes]
-        
-        # Find the point where the rate of change starts to decrease significantly
-        elbow_point = 2  # Default to 2
-        for i in range(1, len(normalized_changes)):
-            if normalized_changes[i] < 0.5 * normalized_changes[i-1]:
-                elbow_point = i + 2  # +2 because we start from k=2 and i is 0-indexed
-                break
-                
-        # Find the k with the highest silhouette score
-        silhouette_point = k_values[silhouette_values.index(max(silhouette_values))]
+        labels, distances = artifact.predict(df[artifact.features].to_numpy(dtype=float))
         
-        # Return the results
         return jsonify({
-            "k_values": list(k_values),
-            "inertia_values": [float(x) for x in inertia_values],
-            "silhouette_values": silhouette_values,
-            "optimal_k_elbow": elbow_point,
-            "optimal_k_silhouette": silhouette_point,
-            "recommended_k": silhouette_point  # Prefer silhouette method
+            "cluster": labels.tolist(),
+            "distance": distances.tolist(),
+            "clusterDescriptions": artifact.descriptions,
+            "features": artifact.features
         })
         
     except Exception as e:
-        return jsonify({"error": f"Error finding optimal k: {str(e)}"}), 500
+        return jsonify({"error": f"Error predicting clusters: {str(e)}"}), 400
 
-def create_sample_data(file_path):
-    """Create sample mall customer data if none exists"""
-    # Sample data
-    data = {
-        'CustomerID': range(1, 201),
-        'Gender': np.random.choice(['Male', 'Female'], size=200),
-        'Age': np.random.randint(18, 70, size=200),
-        'Annual Income (k$)': np.random.randint(15, 140, size=200),
-        'Spending Score (1-100)': np.random.randint(1, 100, size=200)
+def indexed_artifact(model_id):
+    """Saved artifact of a model, which must carry a customer index"""
+    artifact = get_artifact(model_id)
+    if artifact.customers is None:
+        raise ValueError(f"Model {model_id} has no customer index; only in-memory fits are indexed")
+    return artifact
+
+def customer_lookup(artifact, customer_ids):
+    """Cluster, description and centroid distance of every id found in a model's customer index
+    
+    Raises ValueError unless every id is an integer; floats, booleans and strings are not truncated or parsed
+    """
+    if not all(isinstance(customer_id, (int, np.integer)) and not isinstance(customer_id, bool)
+               for customer_id in customer_ids):
+        raise ValueError("Customer ids must be integers")
+    customer_ids = np.asarray(customer_ids, dtype=np.int64)
+    index = artifact.customers
+    positions, found = index.lookup(customer_ids)
+    positions = positions[found]
+    clusters = index.clusters[positions].astype(np.int64).tolist()
+    
+    return {
+        "customerId": customer_ids[found].tolist(),
+        "cluster": clusters,
+        "description": [artifact.descriptions[cluster] for cluster in clusters],
+        "distance": index.distances[positions].astype(float).tolist(),
+        "missing": customer_ids[~found].tolist()
     }
+
+@app.route('/api/customers/<customer_id>', methods=['GET'])
+def get_customer(customer_id):
+    model_id = request.args.get('modelId') or registry.latest_model_id
+    if model_id is None:
+        return model_not_found(None)
+        
+    try:
+        customer_id = int(customer_id)
+    except ValueError:
+        return jsonify({"error": "Customer ids must be integers"}), 400
+    if not np.iinfo(np.int64).min <= customer_id <= np.iinfo(np.int64).max:
+        return jsonify({"error": "Customer id is out of range"}), 400
+        
+    try:
+        artifact = indexed_artifact(model_id)
+    except FileNotFoundError:
+        return model_not_found(model_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    found = customer_lookup(artifact, [customer_id])
+    if found["missing"]:
+        return jsonify({"error": f"Customer not found: {customer_id}"}), 404
+        
+    return jsonify({
+        "customerId": customer_id,
+        "cluster": found["cluster"][0],
+        "description": found["description"][0],
+        "distance": found["distance"][0],
+        "modelId": model_id
+    })
+
+@app.route('/api/customers/lookup', methods=['POST'])
+def lookup_customers():
+    model_id = request.args.get('modelId') or registry.latest_model_id
+    if model_id is None:
+        return model_not_found(None)
+        
+    try:
+        artifact = indexed_artifact(model_id)
+    except FileNotFoundError:
+        return model_not_found(model_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    # Ids arrive as a JSON list or as {"ids": [...]}
+    customer_ids = request.json.get('ids') if isinstance(request.json, dict) else request.json
+    if not isinstance(customer_ids, list):
+        return jsonify({"error": "Send the customer ids as a JSON list or {\"ids\": [...]}"}), 400
+    if len(customer_ids) > MAX_LOOKUP_IDS:
+        return jsonify({"error": f"At most {MAX_LOOKUP_IDS} ids can be looked up per request"}), 400
+        
+    try:
+        found = customer_lookup(artifact, customer_ids)
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({"error": "Customer ids must be integers"}), 400
+        
+    return jsonify({**found, "modelId": model_id})
+
+@app.route('/api/update-model', methods=['POST'])
+def update_model():
+    model_id = request.args.get('modelId')
+    size_threshold = request.args.get('sizeThreshold', 0.1, type=float)
+    inertia_threshold = request.args.get('inertiaThreshold', 0.25, type=float)
     
-    df = pd.DataFrame(data)
+    try:
+        entry = resolve_model(model_id)
+        if entry is None:
+            return model_not_found(model_id)
+        if entry.model.df is None:
+            return jsonify({"error": "Incremental updates are not available for streaming (minibatch) runs"}), 400
+            
+        # Keep the appended rows on disk so the updated model can be rebuilt in any worker
+        if request.mimetype == 'text/csv':
+            delta = pd.read_csv(io.BytesIO(request.get_data()))
+        else:
+            rows = request.json.get('rows') if isinstance(request.json, dict) else request.json
+            delta = pd.DataFrame(rows)
+        delta_file = os.path.join(DATASET_DIR, f'delta_{uuid.uuid4().hex}.csv')
+        delta.to_csv(delta_file, index=False)
+        
+        try:
+            entry, report = apply_update(entry, delta_file, size_threshold, inertia_threshold)
+        except ValueError as e:
+            os.remove(delta_file)
+            return jsonify({"error": str(e)}), 400
+            
+        report["modelId"] = entry.id
+        return jsonify(report)
+        
+    except Exception as e:
+        return jsonify({"error": f"Error updating model: {str(e)}"}), 500
+
+def execute_optimal_k(args, progress=None):
+    """Sweep k over a dataset and pick the elbow and silhouette optima"""
+    progress = progress or (lambda **kwargs: None)
+    data_file = resolve_data_file(args.get('datasetId'))
     
-    # Create some patterns in the data to make clustering more meaningful
-    # High income, high spending
-    df.loc[0:39, 'Annual Income (k$)'] = np.random.randint(80, 140, size=40)
-    df.loc[0:39, 'Spending Score (1-100)'] = np.random.randint(70, 100, size=40)
+    # Sweep parameters
+    k_min = int(args.get('kMin', 2))
+    k_max = int(args.get('kMax', 10))
+    n_workers = int(args['workers']) if args.get('workers') is not None else None
+    warm_start = str(args.get('warmStart', 'false')).lower() == 'true'
+    executor = args.get('executor', 'thread')
+    algorithm = args.get('algorithm', DEFAULT_ALGORITHM)
+    engine = args.get('engine', DEFAULT_ENGINE)
+    init = args.get('init', DEFAULT_INIT)
+    precision = args.get('precision', DEFAULT_PRECISION)
+    threads = parse_threads(args.get('threads'))
     
-    # High income, low spending
-    df.loc[40:79, 'Annual Income (k$)'] = np.random.randint(80, 140, size=40)
-    df.loc[40:79, 'Spending Score (1-100)'] = np.random.randint(1, 30, size=40)
+    if k_min < 2 or k_max < k_min + 1 or k_max > MAX_SWEEP_K:
+        raise ValueError(f"k range must satisfy 2 <= kMin < kMax <= {MAX_SWEEP_K}")
+        
+    # Load and scale the data once for every k
+    progress(stage='loading data')
+    model = MallCustomerSegmentation(algorithm=algorithm, engine=engine, init=init, precision=precision)
+    model.load_data(data_file)
+    X = model.preprocess_data()
     
-    # Low income, high spending
-    df.loc[80:119, 'Annual Income (k$)'] = np.random.randint(15, 40, size=40)
-    df.loc[80:119, 'Spending Score (1-100)'] = np.random.randint(70, 100, size=40)
+    # Calculate inertia and silhouette scores for different k values
+    k_values = range(k_min, k_max + 1)
+    completed = []
     
-    # Low income, low spending
-    df.loc[120:159, 'Annual Income (k$)'] = np.random.randint(15, 40, size=40)
-    df.loc[120:159, 'Spending Score (1-100)'] = np.random.randint(1, 30, size=40)
+    def on_result(result):
+        completed.append(result["k"])
+        progress(stage='sweeping', currentK=result["k"], iterations=result["iterations"],
+                 completed=len(completed), total=len(k_values))
+        
+    sweep = sweep_k(
+        X,
+        list(k_values),
+        n_workers=n_workers,
+        warm_start=warm_start,
+        executor=executor,
+        random_state=model.random_state,
+        max_iter=model.max_iter,
+        algorithm=algorithm,
+        engine=engine,
+        init=init,
+        silhouette_sample_size=model.silhouette_sample_size,
+        progress=on_result,
+        n_threads=threads
+    )
+    inertia_values = [result["inertia"] for result in sweep]
+    silhouette_values = [result["silhouette"] for result in sweep]
+            
+    # Find the optimal k using the elbow method
+    # Calculate the rate of change in inertia
+    inertia_changes = [inertia_values[i-1] - inertia_values[i] for i in range(1, len(inertia_values))]
+    normalized_changes = [change / inertia_values[0] for change in inertia_changes]
     
-    # Average income, average spending
-    df.loc[160:199, 'Annual Income (k$)'] = np.random.randint(40, 80, size=40)
-    df.loc[160:199, 'Spending Score (1-100)'] = np.random.randint(30, 70, size=40)
+    # Find the point where the rate of change starts to decrease significantly
+    elbow_point = k_min  # Default to the smallest k
+    for i in range(1, len(normalized_changes)):
+        if normalized_changes[i] < 0.5 * normalized_changes[i-1]:
+            elbow_point = i + k_min  # i is 0-indexed from the first k
+            break
+            
+    # Find the k with the highest silhouette score
+    silhouette_point = k_values[silhouette_values.index(max(silhouette_values))]
+    
+    return {
+        "k_values": list(k_values),
+        "inertia_values": [float(x) for x in inertia_values],
+        "silhouette_values": silhouette_values,
+        "optimal_k_elbow": elbow_point,
+        "optimal_k_silhouette": silhouette_point,
+        "recommended_k": silhouette_point,  # Prefer silhouette method
+        "iterations": [result["iterations"] for result in sweep],
+        "fit_times": [result["fitTime"] for result in sweep]
+    }
+
+@app.route('/api/optimal-k', methods=['GET'])
+def find_optimal_k():
+    try:
+        return jsonify(execute_optimal_k(request.args))
+        
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({"error": f"Error finding optimal k: {str(e)}"}), 500
+
+def execute_batch_run(data, progress=None):
+    """Fit a grid of configurations on one load of a dataset and keep the best one in the registry"""
+    progress = progress or (lambda **kwargs: None)
+    data_file = resolve_data_file(data.get('datasetId'))
+    
+    # Grid axes; the remaining run-model parameters are shared by every configuration
+    clusters = data.get('clusters', 5)
+    clusters = clusters if isinstance(clusters, list) else [clusters]
+    random_states = data.get('randomStates', [data.get('randomState', 42)])
+    feature_sets = []
+    for features in data.get('featureSets', [data.get('features')]):
+        if features not in feature_sets:
+            feature_sets.append(features)
+    shared = model_params(data)
+    if shared['algorithm'] == 'minibatch':
+        raise ValueError("Batch runs do not support the minibatch algorithm")
+    configs = expand_grid(clusters, random_states, len(feature_sets))
+    n_workers = int(data['workers']) if data.get('workers') is not None else None
+    threads = parse_threads(data.get('threads'))
+    
+    # Load the data once and scale each distinct feature set once
+    progress(stage='loading data')
+    start = time.perf_counter()
+    loader = build_model(shared)
+    loader.load_data(data_file)
+    matrices = []
+    features_used = []
+    for features in feature_sets:
+        missing = [col for col in features or [] if col not in loader.df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        prepared = build_model(shared).with_data_from(loader)
+        matrices.append(prepared.preprocess_data(features))
+        features_used.append(prepared.features_used)
+    prepare_time = time.perf_counter() - start
+    
+    completed = []
+    
+    def on_result(result):
+        completed.append(result)
+        progress(stage='fitting', completed=len(completed), total=len(configs))
+        
+    start = time.perf_counter()
+    results = run_batch(
+        matrices,
+        configs,
+        n_workers=n_workers,
+        max_iter=shared['maxIterations'],
+        algorithm=shared['algorithm'],
+        engine=shared['engine'],
+        init=shared['init'],
+        sample_size=shared['sampleSize'],
+        sample_method=shared['sampleMethod'],
+        silhouette_sample_size=shared['silhouetteSampleSize'],
+        silhouette_random_state=shared['randomState'],
+        progress=on_result,
+        n_threads=threads
+    )
+    fit_time = time.perf_counter() - start
+    
+    # Silhouettes only compare within a feature set, so keep the best configuration of each one,
+    # under the id /api/run-model would give it; the first feature set's becomes the latest model
+    best = []
+    for feature_set, features in enumerate(feature_sets):
+        winner = max((result for result in results if result["featureSet"] == feature_set),
+                     key=lambda result: result["silhouette"])
+        params = model_params(dict(data, clusters=winner["clusters"], randomState=winner["randomState"],
+                                   features=features))
+        model_id = registry.make_key(data_file, params)
+        entry = registry.get(model_id)
+        if entry is None:
+            progress(stage='keeping best', featureSet=feature_set)
+            model = build_model(params, threads).with_data_from(loader)
+            model.fit(features=params['features'])
+            entry = register_model(model_id, model, params, data_file)
+        if feature_set == 0:
+            registry.mark_latest(entry)
+        best.append({**winner, "modelId": entry.id})
+    
+    columns = ["featureSet", "clusters", "randomState", "inertia", "silhouette", "iterations", "converged", "fitTime"]
+    return {
+        "best": best,
+        "rows": len(loader.df),
+        "featureSets": features_used,
+        "results": {column: [result[column] for result in results] for column in columns},
+        "prepareTime": prepare_time,
+        "fitTime": fit_time
+    }
+
+@app.route('/api/run-batch', methods=['POST'])
+def run_batch_models():
+    try:
+        return jsonify(execute_batch_run(request.json or {}))
+        
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({"error": f"Error running batch: {str(e)}"}), 500
+
+def execute_run_model_job(data, progress=None):
+    """Run-model job: the fit stays in the registry, the job only keeps its id and a summary"""
+    entry = execute_run_model(data, progress=progress)
+    return {
+        "modelId": entry.id,
+        "k": entry.model.n_clusters,
+        "algorithm": entry.model.algorithm
+    }
+
+JOB_TYPES = {
+    'run-model': execute_run_model_job,
+    'optimal-k': execute_optimal_k,
+    'run-batch': execute_batch_run
+}
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    data = request.json or {}
+    job_type = data.get('type')
+    params = data.get('params', {})
+    
+    if job_type not in JOB_TYPES:
+        return jsonify({"error": f"Unknown job type. Expected one of {list(JOB_TYPES)}"}), 400
+        
+    execute = JOB_TYPES[job_type]
+    job = job_manager.submit(job_type, params, lambda job: execute(params, progress=job.update))
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+        
+    if job.status != SUCCEEDED:
+        return jsonify({"error": f"Job is {job.status}", **job.to_dict()}), 409
+        
+    # Model runs are looked up in the registry by id and served like /api/run-model
+    if job.kind == 'run-model':
+        model_id = job.result["modelId"]
+        try:
+            entry = resolve_model(model_id)
+        except FileNotFoundError:
+            entry = None
+        if entry is None:
+            return model_not_found(model_id)
+            
+        columnar = request.args.get('format', job.params.get('format', 'records')) == 'columnar'
+        timings = request.args.get('timings', str(job.params.get('timings', False))).lower() == 'true'
+        return cached_response(entry, columnar, timings=timings)
+        
+    return jsonify(job.result)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text exposition format
+    body = instrumentation.render() + (
+        '# HELP segmentation_fits_active Fits currently holding a slot\n'
+        '# TYPE segmentation_fits_active gauge\n'
+        f'segmentation_fits_active {fit_resources.active}\n'
+        '# HELP segmentation_fit_slots Maximum number of concurrent fits\n'
+        '# TYPE segmentation_fit_slots gauge\n'
+        f'segmentation_fit_slots {fit_resources.max_concurrent_fits}\n'
+    )
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+def create_sample_data(file_path):
+    """Create sample mall customer data if none exists"""
+    df = generate_customers(200)
     
     # Save to CSV
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -335,5 +1117,27 @@ def create_sample_data(file_path):
     
     return df
 
+def prewarm():
+    """Fit the sample dataset and serialize its results so the first request on this worker is a cache hit
+    
+    PREWARM_PARAMS (JSON, default {}) holds the /api/run-model parameters to warm; they should match what
+    the frontend sends, since fits are cached per parameter set.
+    """
+    params = json.loads(os.environ.get('PREWARM_PARAMS', '{}'))
+    start = time.perf_counter()
+    try:
+        entry = execute_run_model(params)
+        serialized_body(entry, params.get('format', 'records') == 'columnar')
+    except Exception as e:
+        app.logger.warning(f"Prewarm failed: {str(e)}")
+        return
+    app.logger.info(f"Prewarmed model {entry.id} in {time.perf_counter() - start:.2f}s")
+
+# PREWARM=1 warms before serving; PREWARM=background warms while the worker starts accepting requests
+if os.environ.get('PREWARM', '').lower() in ('1', 'true'):
+    prewarm()
+elif os.environ.get('PREWARM', '').lower() == 'background':
+    threading.Thread(target=prewarm, name='prewarm', daemon=True).start()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
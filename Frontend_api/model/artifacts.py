@@ -0,0 +1,97 @@
+import os
+import json
+import shutil
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
+from customer_index import CustomerIndex, save_customer_index, load_customer_index
+
+# Bump when the on-disk layout changes
+ARTIFACT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+
+class SegmentationArtifact:
+    """A fitted segmentation pipeline loaded from disk: scaler parameters, centroids and metadata,
+    plus the customer index when the model was fitted in memory
+
+    Arrays are memory-mapped, so loading costs a few file opens regardless of model size.
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any], centroids: np.ndarray,
+                 scaler_mean: Optional[np.ndarray], scaler_scale: Optional[np.ndarray],
+                 customers: Optional[CustomerIndex] = None):
+        self.path = path
+        self.manifest = manifest
+        self.features = manifest['features']
+        self.descriptions = manifest['descriptions']
+        self.centroids = centroids
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.customers = customers
+        self._centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Apply the stored scaling to raw feature values"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.scaler_mean is not None:
+            X = (X - self.scaler_mean) / self.scaler_scale
+        return X
+
+    def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest centroid and its distance (in model space) for each raw row"""
+        X = self.transform(X)
+        squared = np.einsum('ij,ij->i', X, X)[:, None] - 2.0 * X @ self.centroids.T + self._centroid_norms
+        labels = squared.argmin(axis=1)
+        distances = np.sqrt(np.maximum(squared[np.arange(len(X)), labels], 0.0))
+        return labels, distances
+
+
+def save_artifact(path: str, features: List[str], centroids: np.ndarray, descriptions: List[str],
+                  scaler_mean: Optional[np.ndarray] = None, scaler_scale: Optional[np.ndarray] = None,
+                  metadata: Optional[Dict[str, Any]] = None, customers: Optional[CustomerIndex] = None) -> str:
+    """Write a versioned artifact directory, replacing any existing one at path"""
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    np.save(os.path.join(tmp_path, 'centroids.npy'), np.ascontiguousarray(centroids, dtype=np.float64))
+    if scaler_mean is not None:
+        np.save(os.path.join(tmp_path, 'scaler_mean.npy'), np.asarray(scaler_mean, dtype=np.float64))
+        np.save(os.path.join(tmp_path, 'scaler_scale.npy'), np.asarray(scaler_scale, dtype=np.float64))
+    if customers is not None:
+        save_customer_index(tmp_path, customers)
+
+    manifest = {
+        "version": ARTIFACT_VERSION,
+        "features": list(features),
+        "k": int(len(centroids)),
+        "normalize": scaler_mean is not None,
+        "descriptions": list(descriptions),
+        **(metadata or {})
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_artifact(path: str) -> SegmentationArtifact:
+    """Load an artifact directory written by save_artifact"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Model artifact not found: {path}")
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported artifact version {manifest.get('version')}, expected {ARTIFACT_VERSION}")
+
+    centroids = np.load(os.path.join(path, 'centroids.npy'), mmap_mode='r')
+    scaler_mean = scaler_scale = None
+    if manifest['normalize']:
+        scaler_mean = np.load(os.path.join(path, 'scaler_mean.npy'), mmap_mode='r')
+        scaler_scale = np.load(os.path.join(path, 'scaler_scale.npy'), mmap_mode='r')
+
+    return SegmentationArtifact(path, manifest, centroids, scaler_mean, scaler_scale, load_customer_index(path))
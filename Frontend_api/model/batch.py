@@ -0,0 +1,106 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from silhouette import silhouette_scores, sample_rows, DEFAULT_SAMPLE_SIZE
+from resources import fit_resources
+from engines import get_engine, DEFAULT_ENGINE, DEFAULT_ALGORITHM, DEFAULT_INIT
+from coreset import fit_on_sample
+from sweep import default_workers, MAX_SWEEP_K
+from typing import Dict, List, Any, Callable, Optional
+
+MAX_BATCH_CONFIGS = 100
+
+
+def expand_grid(clusters: List[int], random_states: List[int], n_feature_sets: int) -> List[Dict[str, int]]:
+    """Every (feature set, k, random state) combination, feature set outermost"""
+    configs = [
+        {"featureSet": feature_set, "clusters": int(k), "randomState": int(random_state)}
+        for feature_set in range(n_feature_sets)
+        for k in clusters
+        for random_state in random_states
+    ]
+    if not configs:
+        raise ValueError("The grid has no configurations")
+    if len(configs) > MAX_BATCH_CONFIGS:
+        raise ValueError(f"The grid has {len(configs)} configurations; at most {MAX_BATCH_CONFIGS} are allowed")
+    return configs
+
+
+def _fit_config(X: np.ndarray, config: Dict[str, int], params: Dict[str, Any],
+                scored_rows: np.ndarray) -> Dict[str, Any]:
+    """Fit one configuration, keeping its labels on the rows the silhouette is scored on"""
+    engine = get_engine(params['engine'], algorithm=params['algorithm'], init=params['init'])
+    k, random_state = config["clusters"], config["randomState"]
+    with fit_resources.slot(params['n_threads']):
+        start = time.perf_counter()
+        if params['sample_size'] and params['sample_size'] < len(X):
+            fitted, _ = fit_on_sample(engine, X, k, params['sample_size'], params['sample_method'],
+                                      random_state=random_state, max_iter=params['max_iter'])
+        else:
+            fitted = engine.fit(X, k, random_state=random_state, max_iter=params['max_iter'])
+        fit_time = time.perf_counter() - start
+
+    return {
+        **config,
+        "inertia": float(fitted.inertia_),
+        "labels": fitted.labels_[scored_rows],
+        "iterations": int(fitted.n_iter_),
+        "converged": bool(fitted.converged_),
+        "fitTime": fit_time
+    }
+
+
+def run_batch(matrices: List[np.ndarray], configs: List[Dict[str, int]], n_workers: Optional[int] = None,
+              max_iter: int = 300, algorithm: str = DEFAULT_ALGORITHM, engine: str = DEFAULT_ENGINE, init: str = DEFAULT_INIT,
+              sample_size: Optional[int] = None, sample_method: str = 'coreset',
+              silhouette_sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE, silhouette_random_state: int = 42,
+              progress: Optional[Callable[..., None]] = None, n_threads: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Fit every configuration on the preprocessed matrix of its feature set, on a thread pool
+
+    matrices[i] is the scaled data for feature set i, shared by every configuration that
+    uses it. Results come back in configuration order; progress, if given, is called with
+    each fit as it completes. Every fit takes a slot from fit_resources.
+
+    All configurations are scored on the same silhouette sample, so their scores compare
+    like for like, and each feature set's pairwise distances on that sample are computed
+    once for all of its configurations (see silhouette.silhouette_scores).
+    """
+    for config in configs:
+        n_rows = len(matrices[config["featureSet"]])
+        if not 2 <= config["clusters"] <= min(MAX_SWEEP_K, n_rows - 1):
+            raise ValueError(f"clusters must be between 2 and {min(MAX_SWEEP_K, n_rows - 1)}")
+
+    params = {
+        "max_iter": max_iter,
+        "algorithm": algorithm,
+        "engine": engine,
+        "init": init,
+        "sample_size": sample_size,
+        "sample_method": sample_method,
+        "silhouette_sample_size": silhouette_sample_size,
+        "n_threads": n_threads
+    }
+    n_rows = len(matrices[0])
+    if silhouette_sample_size and silhouette_sample_size < n_rows:
+        scored_rows = np.sort(sample_rows(n_rows, silhouette_sample_size, silhouette_random_state))
+    else:
+        scored_rows = np.arange(n_rows)
+
+    n_workers = max(1, min(n_workers or default_workers(), len(configs)))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(configs)
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = {
+            pool.submit(_fit_config, matrices[config["featureSet"]], config, params, scored_rows): i
+            for i, config in enumerate(configs)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(results[futures[future]])
+
+    for feature_set, X in enumerate(matrices):
+        members = [result for result in results if result["featureSet"] == feature_set]
+        scores = silhouette_scores(X[scored_rows], [result.pop("labels") for result in members])
+        for result, score in zip(members, scores):
+            result["silhouette"] = score
+    return results
@@ -0,0 +1,284 @@
+"""Benchmark the segmentation pipeline and API endpoints on synthetic data
+
+Usage:
+    python benchmark.py --rows 1000,100000,1000000 --output bench.json
+    python benchmark.py --rows 1000,100000 --baseline bench.json --tolerance 0.25
+    python benchmark.py --rows 1000000 --skip-pipeline --skip-endpoints \
+        --engines sklearn:lloyd:k-means++:10,numpy:lloyd,numpy:elkan --precisions float32,float64
+
+Each size gets a synthetic CSV (see synthetic.py). Every pipeline stage and endpoint is timed,
+and peak traced memory is recorded per stage. Results are written as JSON. With --baseline,
+stages slower than baseline * (1 + tolerance) are reported and the exit status is 1.
+With --engines, every engine:algorithm[:init[:n_init]] spec is fitted at every --precisions on
+the same data, and each is reported as its own stage with its inertia relative to the first spec.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from synthetic import write_customers_csv, generate_customers
+
+DEFAULT_ROWS = [1000, 100000, 1000000, 10000000]
+
+# Endpoints whose cost grows with k times the data are skipped above this many rows
+DEFAULT_SWEEP_MAX_ROWS = 1000000
+
+
+class StageTimer:
+    """Collects wall time and peak traced memory for named stages"""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.results: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str, rows: int, **extra):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            result = {"rows": rows, "stage": name, "seconds": seconds,
+                      "peakMemoryMB": peak / 2 ** 20 if peak is not None else None}
+            result.update(extra)
+            self.results.append(result)
+            print(f"{rows:>10} {name:<32} {seconds:9.3f}s"
+                  + (f" {result['peakMemoryMB']:9.1f} MB" if peak is not None else ""), flush=True)
+
+
+def fit_features(args) -> Optional[List[str]]:
+    """Clustering features: the defaults, or income and spending plus the extra synthetic columns"""
+    if not args.extra_features:
+        return None
+    return ['Annual Income (k$)', 'Spending Score (1-100)'] + [f'Feature {j + 1}' for j in range(args.extra_features)]
+
+
+def bench_pipeline(timer: StageTimer, data_file: str, rows: int, args) -> None:
+    """Time the MallCustomerSegmentation stages directly"""
+    from mall_segmentation import MallCustomerSegmentation
+
+    model = MallCustomerSegmentation(n_clusters=args.clusters, algorithm=args.algorithm, sample_size=args.sample_size)
+    with timer.stage('load_data', rows):
+        model.load_data(data_file)
+    with timer.stage('preprocess_data', rows):
+        X = model.preprocess_data(fit_features(args))
+    with timer.stage('fit', rows):
+        model.fit(X)
+    with timer.stage('get_silhouette_score', rows):
+        model.get_silhouette_score()
+    with timer.stage('get_cluster_metrics', rows):
+        model.get_cluster_metrics()
+    if rows <= args.results_max_rows:
+        with timer.stage('get_results', rows):
+            model.get_results()
+        with timer.stage('get_results_columnar', rows):
+            model.get_results(columnar=True)
+
+
+def bench_engines(timer: StageTimer, data_file: str, rows: int, args) -> None:
+    """Time the fit alone for each engine configuration on the same data and compare its inertia
+
+    Every spec is fitted once per --fit-seeds random state. inertiaRatio is the mean, and
+    worstInertiaRatio the largest, of its inertia over the first spec's at the same precision
+    and seed, so values above 1 mean worse clusterings than the reference.
+    """
+    from mall_segmentation import MallCustomerSegmentation
+    from engines import get_engine, DEFAULT_INIT
+
+    model = MallCustomerSegmentation(n_clusters=args.clusters)
+    model.load_data(data_file)
+    features = fit_features(args)
+    reference: Dict[str, List[float]] = {}
+    for spec in args.engines.split(','):
+        engine, _, rest = spec.partition(':')
+        algorithm, _, rest = rest.partition(':')
+        init, _, n_init = rest.partition(':')
+        options = {"n_init": int(n_init)} if n_init else {}
+        for precision in args.precisions.split(','):
+            model.precision = precision
+            X = model.preprocess_data(features)
+            fitter = get_engine(engine, algorithm=algorithm or 'lloyd', init=init or DEFAULT_INIT, **options)
+            name = f'fit {engine}:{fitter.algorithm}:{fitter.init}:{n_init or "default"}:{precision}'
+            with timer.stage(name, rows):
+                inertias = [float(fitter.fit(X, args.clusters, random_state=seed).inertia_)
+                            for seed in range(args.fit_seeds)]
+            ratios = np.array(inertias) / np.array(reference.setdefault(precision, inertias))
+            timer.results[-1].update(inertia=float(np.mean(inertias)), inertiaRatio=float(ratios.mean()),
+                                     worstInertiaRatio=float(ratios.max()), fits=args.fit_seeds)
+
+
+def bench_endpoints(timer: StageTimer, data_file: str, rows: int, args) -> None:
+    """Time the API endpoints through the Flask test client"""
+    import api
+
+    client = api.app.test_client()
+
+    def call(name, method, path, **kwargs):
+        with timer.stage(name, rows):
+            response = getattr(client, method)(path, **kwargs)
+            body = response.get_data()  # Drains streamed responses
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} failed with {response.status_code}: {body[:200]!r}")
+        return response
+
+    with open(data_file, 'rb') as f:
+        upload = call('POST /api/upload', 'post', '/api/upload', input_stream=f, content_type='text/csv',
+                      content_length=os.path.getsize(data_file))
+    dataset_id = upload.get_json()["datasetId"]
+
+    run_params = {"datasetId": dataset_id, "clusters": args.clusters, "algorithm": args.algorithm,
+                  "features": fit_features(args), "sampleSize": args.sample_size, "format": "columnar"}
+    if rows > args.results_max_rows:
+        run_params["algorithm"] = 'minibatch'
+    run = call('POST /api/run-model', 'post', '/api/run-model', json=run_params)
+    call('POST /api/run-model (cached)', 'post', '/api/run-model', json=run_params)
+    model_id = run.get_json()["modelInfo"]["modelId"]
+    streaming = run_params["algorithm"] == 'minibatch'
+
+    if not streaming:
+        call('GET /api/segmentation', 'get', f'/api/segmentation?modelId={model_id}&format=columnar')
+        call('GET /api/segmentation ndjson', 'get', f'/api/segmentation?modelId={model_id}&format=ndjson')
+        call('GET /api/segmentation/customers', 'get', f'/api/segmentation/customers?modelId={model_id}&limit=1000')
+        call('GET /api/points', 'get', f'/api/points?modelId={model_id}')
+        call('GET /api/export-plot', 'get', f'/api/export-plot?modelId={model_id}&dpi=100')
+    call('GET /api/export-csv', 'get', f'/api/export-csv?modelId={model_id}')
+    call('GET /api/export-csv gzip', 'get', f'/api/export-csv?modelId={model_id}&compression=gzip')
+
+    new_rows = generate_customers(1000, n_clusters=args.clusters, n_extra_features=args.extra_features,
+                                  random_state=1)
+    call('POST /api/predict', 'post', f'/api/predict?modelId={model_id}', json={"rows": new_rows.to_dict('records')})
+
+    if rows <= args.sweep_max_rows:
+        call('GET /api/optimal-k', 'get',
+             f'/api/optimal-k?datasetId={dataset_id}&kMin=2&kMax={args.sweep_max_k}&algorithm={args.algorithm}')
+
+    api.registry.clear()
+    api.loaded_artifacts.clear()
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[Dict[str, Any]]:
+    """Stages that are more than tolerance slower than the same stage and size in the baseline"""
+    reference = {(result["rows"], result["stage"]): result["seconds"] for result in baseline}
+    regressions = []
+    for result in results:
+        before = reference.get((result["rows"], result["stage"]))
+        if before and result["seconds"] > before * (1 + tolerance):
+            regressions.append({
+                "rows": result["rows"],
+                "stage": result["stage"],
+                "baseline": before,
+                "seconds": result["seconds"],
+                "ratio": result["seconds"] / before
+            })
+    return regressions
+
+
+def run(args) -> int:
+    sizes = [int(value) for value in args.rows.split(',')]
+    timer = StageTimer(trace_memory=not args.no_memory)
+
+    # The API writes under ./data, so it runs in a scratch directory
+    workdir = tempfile.mkdtemp(prefix='segmentation-bench-')
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for rows in sizes:
+            data_file = os.path.join(workdir, f'customers_{rows}.csv')
+            with timer.stage('generate_data', rows):
+                write_customers_csv(data_file, rows, n_clusters=args.clusters,
+                                    n_extra_features=args.extra_features, random_state=args.seed)
+            for repeat in range(args.repeat):
+                if not args.skip_pipeline:
+                    bench_pipeline(timer, data_file, rows, args)
+                if not args.skip_endpoints:
+                    bench_endpoints(timer, data_file, rows, args)
+                if args.engines:
+                    bench_engines(timer, data_file, rows, args)
+            os.remove(data_file)
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Keep the fastest repeat of every stage
+    best: Dict[Any, Dict[str, Any]] = {}
+    for result in timer.results:
+        key = (result["rows"], result["stage"])
+        if key not in best or result["seconds"] < best[key]["seconds"]:
+            best[key] = result
+    report = {"environment": environment(), "config": vars(args), "results": list(best.values())}
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f)["results"], args.tolerance)
+        report["regressions"] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['rows']:>10} {regression['stage']:<32} "
+                  f"{regression['baseline']:.3f}s -> {regression['seconds']:.3f}s ({regression['ratio']:.2f}x)")
+        status = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return status
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', default=','.join(str(rows) for rows in DEFAULT_ROWS),
+                        help='comma-separated dataset sizes')
+    parser.add_argument('--clusters', type=int, default=5, help='segments in the data and clusters to fit')
+    parser.add_argument('--extra-features', type=int, default=0, help='extra numeric columns in the data')
+    parser.add_argument('--algorithm', default='lloyd', help='KMeans algorithm for the in-memory fits')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per size; the fastest is kept')
+    parser.add_argument('--results-max-rows', type=int, default=1000000,
+                        help='above this size, skip full JSON results and fit through the streaming path')
+    parser.add_argument('--sweep-max-rows', type=int, default=DEFAULT_SWEEP_MAX_ROWS)
+    parser.add_argument('--sweep-max-k', type=int, default=8)
+    parser.add_argument('--sample-size', type=int, help='fit on a coreset of this many rows, then assign every row')
+    parser.add_argument('--engines', help='comma-separated engine:algorithm[:init[:n_init]] fits to compare, '
+                        'e.g. sklearn:lloyd:k-means++:10,numpy:elkan; the first is the inertia reference')
+    parser.add_argument('--fit-seeds', type=int, default=1, help='random states each --engines spec is fitted with')
+    parser.add_argument('--precisions', default='float32', help='comma-separated precisions for --engines')
+    parser.add_argument('--skip-pipeline', action='store_true')
+    parser.add_argument('--skip-endpoints', action='store_true')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace memory (tracing slows pure-Python code)')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a stage counts as a regression')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(run(parse_args()))
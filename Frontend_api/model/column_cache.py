@@ -0,0 +1,130 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from compact import smallest_int_dtype
+from typing import Dict, List, Any, Optional
+
+MANIFEST_FILE = 'columns.json'
+
+
+def cache_dir(file_path: str) -> str:
+    """Directory holding the binary column cache for a CSV file"""
+    return os.path.splitext(file_path)[0] + '.columns'
+
+
+def _numeric_dtype(dtype_name: str) -> Optional[np.dtype]:
+    try:
+        dtype = np.dtype(dtype_name)
+    except TypeError:
+        return None
+    return dtype if dtype.kind in 'biuf' else None
+
+
+def build_column_cache(file_path: str, stats: Dict[str, Any], chunk_rows: int = 100000) -> str:
+    """Convert a CSV into one .npy file per column, using dtypes and row count from its upload stats
+
+    Integer columns are stored in the narrowest type holding their range, floats keep their
+    dtype, and everything else is stored as integer category codes with the categories
+    listed in the manifest.
+    """
+    target = cache_dir(file_path)
+    tmp_dir = target + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    n_rows = stats["rows"]
+    arrays = {}
+    categories: Dict[str, Dict[Any, int]] = {}
+    for i, col in enumerate(stats["columns"]):
+        dtype = _numeric_dtype(stats["dtypes"][col])
+        if dtype is None:
+            categories[col] = {}
+            dtype = np.dtype(np.int32)
+        elif dtype.kind in 'iu' and col in stats["stats"]:
+            dtype = smallest_int_dtype(stats["stats"][col]["min"], stats["stats"][col]["max"])
+        arrays[col] = np.lib.format.open_memmap(os.path.join(tmp_dir, f'{i}.npy'), mode='w+',
+                                                dtype=dtype, shape=(n_rows,))
+
+    offset = 0
+    for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+        stop = offset + len(chunk)
+        for col in stats["columns"]:
+            if col in categories:
+                mapping = categories[col]
+                values = chunk[col]
+                for value in values.dropna().unique():
+                    if value not in mapping:
+                        mapping[value] = len(mapping)
+                arrays[col][offset:stop] = values.map(mapping).fillna(-1).to_numpy(dtype=np.int32)
+            else:
+                arrays[col][offset:stop] = chunk[col].to_numpy(dtype=arrays[col].dtype)
+        offset = stop
+
+    for array in arrays.values():
+        array.flush()
+
+    manifest = {
+        "rows": n_rows,
+        "fileSize": os.path.getsize(file_path),
+        "columns": [
+            {
+                "name": col,
+                "file": f'{i}.npy',
+                "categories": [value.item() if hasattr(value, 'item') else value for value in categories[col]]
+                if col in categories else None
+            }
+            for i, col in enumerate(stats["columns"])
+        ]
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+    return target
+
+
+def cached_columns(file_path: str) -> Optional[List[str]]:
+    """Column names available in the cache, or None if there is no up-to-date cache"""
+    manifest = _load_manifest(file_path)
+    return [column["name"] for column in manifest["columns"]] if manifest else None
+
+
+def load_column_cache(file_path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """Read the cached columns of a CSV (all, or only those listed) without parsing any text
+
+    Returns None when there is no up-to-date cache or a requested column is not in it.
+    """
+    manifest = _load_manifest(file_path)
+    if manifest is None:
+        return None
+
+    by_name = {column["name"]: column for column in manifest["columns"]}
+    if columns is None:
+        columns = list(by_name)
+    elif any(col not in by_name for col in columns):
+        return None
+
+    directory = cache_dir(file_path)
+    data = {}
+    for col in columns:
+        column = by_name[col]
+        values = np.load(os.path.join(directory, column["file"]), mmap_mode='r')
+        if column["categories"] is not None:
+            data[col] = pd.Categorical.from_codes(values, categories=column["categories"])
+        else:
+            data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def _load_manifest(file_path: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(cache_dir(file_path), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("fileSize") != os.path.getsize(file_path):
+        return None
+    return manifest
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+# Integer types tried in order when downcasting
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+DEFAULT_READ_CHUNK_ROWS = 100000
+
+
+def smallest_int_dtype(low: float, high: float) -> np.dtype:
+    """Narrowest signed integer type holding every value in [low, high]"""
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _is_numeric(dtype: Any) -> bool:
+    try:
+        return np.dtype(dtype).kind in 'biuf'
+    except TypeError:
+        return False
+
+
+def compact_dtypes(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """read_csv dtypes for a dataset from its upload statistics
+
+    Integer columns get the narrowest type that holds their min and max and text columns
+    'category'. Float columns stay as parsed, since their values are returned to clients
+    and the clustering matrix is built at the model precision separately.
+    """
+    dtypes: Dict[str, Any] = {}
+    for col in stats["columns"]:
+        name = stats["dtypes"][col]
+        if not _is_numeric(name):
+            dtypes[col] = 'category'
+        elif np.dtype(name).kind in 'iu' and col in stats["stats"]:
+            dtypes[col] = smallest_int_dtype(stats["stats"][col]["min"], stats["stats"][col]["max"])
+    return dtypes
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast the columns of df in place, one column at a time, and return it
+
+    Integers shrink to the narrowest type holding their range and text columns become
+    categorical; floats keep their precision (see compact_dtypes).
+    """
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            continue
+        if not _is_numeric(values.dtype):
+            df[col] = values.astype('category')
+        elif values.dtype.kind in 'iu' and len(values):
+            dtype = smallest_int_dtype(values.min(), values.max())
+            if dtype != values.dtype:
+                df[col] = values.astype(dtype)
+    return df
+
+
+def read_compact_csv(file_path: str, stats: Optional[Dict[str, Any]] = None,
+                     chunk_rows: int = DEFAULT_READ_CHUNK_ROWS) -> pd.DataFrame:
+    """Parse a CSV straight into compact dtypes
+
+    With upload statistics the dtypes are declared up front, so no wide copy is ever built.
+    Without them the file is parsed in chunks that are downcast one by one, so the wide
+    dtypes are only held for one chunk at a time.
+    """
+    if stats is not None:
+        return pd.read_csv(file_path, dtype=compact_dtypes(stats))
+
+    chunks: List[pd.DataFrame] = [
+        compact_frame(chunk)
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows)
+    ]
+    if len(chunks) == 1:
+        return chunks[0]
+
+    # Give every chunk the same categories so the concatenated column stays categorical
+    for col in chunks[0].columns:
+        if all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks):
+            categories = pd.Index(pd.concat([chunk[col].cat.categories.to_series() for chunk in chunks]).unique())
+            for chunk in chunks:
+                chunk[col] = chunk[col].cat.set_categories(categories)
+    return compact_frame(pd.concat(chunks, ignore_index=True))
@@ -0,0 +1,108 @@
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+from engines import assign_labels, lloyd, FittedClusters, DEFAULT_WORKING_MEMORY_MB
+from instrumentation import instrumentation
+
+SAMPLE_METHODS = ('coreset', 'uniform')
+
+# Rows per block when measuring distances to the data mean
+_MEAN_DISTANCE_BLOCK_ROWS = 1000000
+
+
+def lightweight_coreset(X: np.ndarray, size: int, rng: np.random.RandomState) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows and weights of a lightweight coreset (Bachem, Lucic and Krause, 2018)
+
+    Each row is drawn with probability q = 1/2 * 1/n + 1/2 * d(x, mean)² / sum d(x, mean)²,
+    so outlying rows that pull centroids are over-represented, and weighted by 1 / (size * q)
+    so weighted sums over the coreset are unbiased estimates of sums over all rows. Two passes
+    over X (mean, then distances); rows drawn more than once are merged into one weighted row.
+    """
+    n = len(X)
+    step = _MEAN_DISTANCE_BLOCK_ROWS
+    # Column sums as BLAS products per block, accumulated across blocks in float64
+    ones = np.ones(min(step, n), dtype=X.dtype)
+    sums = np.zeros(X.shape[1])
+    for start in range(0, n, step):
+        block = X[start:start + step]
+        sums += ones[:len(block)] @ block
+    mean = (sums / n).astype(X.dtype)
+
+    distances = np.empty(n, dtype=np.float64)
+    for start in range(0, n, step):
+        block = X[start:start + step] - mean
+        distances[start:start + step] = np.einsum('ij,ij->i', block, block)
+    total = distances.sum()
+    q = 0.5 / n + (0.5 * distances / total if total > 0 else 0.5 / n)
+
+    # Inverse-CDF draws, which skip the input checks rng.choice(p=...) makes on n probabilities
+    cdf = np.cumsum(q)
+    drawn = np.minimum(np.searchsorted(cdf, rng.random_sample(size) * cdf[-1], side='right'), n - 1)
+    rows, counts = np.unique(drawn, return_counts=True)
+    return rows, counts / (size * q[rows])
+
+
+def uniform_sample(X: np.ndarray, size: int, rng: np.random.RandomState) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of a uniform sample with replacement, each weighted by n / size"""
+    n = len(X)
+    rows, counts = np.unique(rng.randint(0, n, size=size), return_counts=True)
+    return rows, counts * (n / size)
+
+
+def draw_sample(X: np.ndarray, size: int, method: str = 'coreset',
+                random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted row indices and weights of a weighted sample of about size rows"""
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"sampleMethod must be one of {', '.join(SAMPLE_METHODS)}")
+    rng = np.random.RandomState(random_state)
+    if method == 'uniform':
+        return uniform_sample(X, size, rng)
+    return lightweight_coreset(X, size, rng)
+
+
+def approximation_report(X: np.ndarray, centers: np.ndarray, inertia: float, sample_inertia: float,
+                         validation_size: int, max_iter: int = 300, tol: float = 1e-4, random_state: int = 42,
+                         working_memory_mb: int = DEFAULT_WORKING_MEMORY_MB) -> Dict[str, Any]:
+    """How close centroids fitted on a sample come to a full fit, estimated on a validation sample
+
+    A fresh uniform sample is refined with Lloyd iterations starting from the given centers,
+    and its per-row inertia, scaled to n rows, estimates what a full fit would reach. The
+    estimate is slightly optimistic (the refinement also fits the validation rows' noise),
+    so inertiaRatio, the full-data inertia of the sampled fit over that estimate, errs high.
+    """
+    n = len(X)
+    rng = np.random.RandomState(random_state + 1)
+    validation = X[np.sort(rng.randint(0, n, size=min(validation_size, n)))]
+    refined, _, _ = lloyd(validation, centers.astype(validation.dtype), max_iter, tol, working_memory_mb)
+    _, distances = assign_labels(validation, refined, working_memory_mb)
+    estimate = float(distances.sum(dtype=np.float64)) * n / len(validation)
+    return {
+        "inertia": inertia,
+        "sampleInertia": sample_inertia,
+        "validationInertia": estimate,
+        "validationSize": len(validation),
+        "inertiaRatio": inertia / estimate if estimate > 0 else 1.0
+    }
+
+
+def fit_on_sample(engine: Any, X: np.ndarray, n_clusters: int, sample_size: int, method: str = 'coreset',
+                  random_state: int = 42, max_iter: int = 300,
+                  timings: Optional[Dict[str, Dict[str, float]]] = None) -> Tuple[FittedClusters, Dict[str, Any]]:
+    """Fit centroids on a weighted sample of X, then assign every row to its nearest centroid
+
+    Returns the fit over all rows and its approximation report. Each step is timed as a
+    stage (sample, kmeans, assign, validate), also into timings when given.
+    """
+    with instrumentation.stage('sample', timings):
+        rows, weights = draw_sample(X, sample_size, method, random_state)
+    with instrumentation.stage('kmeans', timings):
+        fitted = engine.fit(X[rows], n_clusters, random_state=random_state, max_iter=max_iter,
+                            sample_weight=weights)
+    with instrumentation.stage('assign', timings):
+        centers = fitted.cluster_centers_.astype(X.dtype)
+        labels, distances = assign_labels(X, centers)
+        inertia = float(distances.sum(dtype=np.float64))
+    with instrumentation.stage('validate', timings):
+        report = approximation_report(X, centers, inertia, float(fitted.inertia_), sample_size,
+                                      max_iter=max_iter, random_state=random_state)
+    report = {"method": method, "sampleSize": sample_size, "distinctRows": len(rows), "rows": len(X), **report}
+    return FittedClusters(centers, labels, inertia, fitted.n_iter_, bool(fitted.converged_), engine.name), report
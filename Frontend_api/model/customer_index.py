@@ -0,0 +1,63 @@
+import os
+import numpy as np
+from typing import Optional, Tuple
+from compact import smallest_int_dtype
+
+# One .npy file per array, stored in the model artifact directory
+INDEX_FILES = ('customer_ids', 'customer_rows', 'customer_clusters', 'customer_distances')
+
+
+class CustomerIndex:
+    """Customer ids in sorted order, with each customer's row, cluster and distance to its centroid
+
+    Lookups are binary searches over the sorted ids, so the arrays can stay memory-mapped and
+    a query only touches the few pages it needs.
+    """
+
+    def __init__(self, ids: np.ndarray, rows: np.ndarray, clusters: np.ndarray, distances: np.ndarray):
+        self.ids = ids
+        self.rows = rows
+        self.clusters = clusters
+        self.distances = distances
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def lookup(self, customer_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Index positions of the given ids, and a mask of the ids that were found"""
+        customer_ids = np.asarray(customer_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.zeros(len(customer_ids), dtype=np.int64), np.zeros(len(customer_ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.ids, customer_ids), len(self.ids) - 1)
+        return positions, self.ids[positions] == customer_ids
+
+
+def build_customer_index(ids: np.ndarray, labels: np.ndarray, distances: np.ndarray,
+                         n_clusters: int) -> CustomerIndex:
+    """Index rows by customer id; a repeated id resolves to its first row"""
+    ids = np.asarray(ids, dtype=np.int64)
+    # Ids usually arrive already sorted, in which case the sort is skipped
+    if np.all(ids[1:] >= ids[:-1]):
+        order = np.arange(len(ids))
+    else:
+        order = np.argsort(ids, kind='stable')
+    return CustomerIndex(
+        ids[order],
+        order.astype(smallest_int_dtype(0, max(len(ids) - 1, 0))),
+        np.asarray(labels)[order].astype(smallest_int_dtype(0, n_clusters - 1)),
+        np.asarray(distances, dtype=np.float32)[order]
+    )
+
+
+def save_customer_index(path: str, index: CustomerIndex) -> None:
+    """Write the index arrays into the directory at path"""
+    arrays = (index.ids, index.rows, index.clusters, index.distances)
+    for name, array in zip(INDEX_FILES, arrays):
+        np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(array))
+
+
+def load_customer_index(path: str) -> Optional[CustomerIndex]:
+    """Memory-map an index written by save_customer_index, or None if path has none"""
+    if not os.path.exists(os.path.join(path, f'{INDEX_FILES[0]}.npy')):
+        return None
+    return CustomerIndex(*(np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in INDEX_FILES))
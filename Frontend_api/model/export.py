@@ -0,0 +1,141 @@
+import zlib
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_EXPORT_CHUNK_ROWS = 50000
+
+# Rows of the labelled CSV used to tell numeric columns apart when a dataset has no upload statistics
+_DTYPE_SAMPLE_ROWS = 1000
+
+
+def _export_dtype(name: str) -> str:
+    """Read dtype for a column from its whole-file dtype in the upload statistics"""
+    try:
+        kind = np.dtype(name).kind
+    except TypeError:
+        return 'str'
+    if kind in 'iu':
+        return 'int64'
+    if kind == 'f':
+        return 'float64'
+    if kind == 'b':
+        return 'bool'
+    return 'str'
+
+
+def export_dtypes(model, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """dtype of every exported column, fixed before the first chunk so every chunk agrees
+
+    In-memory fits use the frame's own dtypes. Streaming fits take them from the dataset's
+    upload statistics, which describe the whole file (a column with any missing value is
+    float there), falling back to a sample of the labelled CSV with numbers read as float64.
+    """
+    if model.df is not None:
+        return {col: model.df[col].dtype for col in columns or model.df.columns}
+
+    names = columns or available_columns(model)
+    if model.column_stats is not None:
+        source = model.column_stats["dtypes"]
+        dtypes = {col: _export_dtype(source[col]) for col in names if col in source}
+    else:
+        sample = pd.read_csv(model.labels_path, nrows=_DTYPE_SAMPLE_ROWS, usecols=names)
+        dtypes = {col: 'float64' if pd.api.types.is_numeric_dtype(sample[col]) else 'str' for col in names}
+    if 'Cluster' in names:
+        dtypes['Cluster'] = 'int64'
+    return dtypes
+
+
+def iter_frames(model, columns: Optional[List[str]] = None, cluster: Optional[int] = None,
+                chunk_rows: int = DEFAULT_EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the labelled rows of a fitted model in chunks, optionally for selected columns and one cluster
+
+    In-memory fits are sliced from model.df; streaming fits are re-read from their labelled CSV
+    with the dtypes of export_dtypes, so no chunk infers its own.
+    """
+    if model.df is None:
+        dtypes = export_dtypes(model, columns)
+        for chunk in pd.read_csv(model.labels_path, chunksize=chunk_rows, usecols=columns, dtype=dtypes):
+            if cluster is not None:
+                chunk = chunk[chunk['Cluster'] == cluster]
+            yield chunk
+        return
+
+    frame = model.df if columns is None else model.df[columns]
+    rows = model.cluster_rows(cluster)
+    for start in range(0, len(rows), chunk_rows):
+        yield frame.iloc[rows[start:start + chunk_rows]]
+
+
+def available_columns(model) -> List[str]:
+    """Columns that can be requested from iter_frames"""
+    if model.df is None:
+        return pd.read_csv(model.labels_path, nrows=0).columns.tolist()
+    return model.df.columns.tolist()
+
+
+def csv_stream(frames: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode frames as one CSV document, header first"""
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back in batches"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_stream(frames: Iterable[pd.DataFrame], dtypes: Dict[str, Any]) -> Iterator[bytes]:
+    """Encode frames as a Parquet file, one row group per frame
+
+    The schema is built once from dtypes (see export_dtypes) and every frame is converted to
+    it, so a chunk cannot change a column's type halfway through the response. Requires
+    pyarrow, which is imported here so the API runs without it.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    empty = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dtypes.items()})
+    schema = pa.Schema.from_pandas(empty, preserve_index=False)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for frame in frames:
+        writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip-compress a byte stream on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,150 @@
+import io
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, BinaryIO
+
+# Rows parsed per chunk while ingesting an upload
+DEFAULT_CHUNK_ROWS = 100000
+
+
+class _TeeStream(io.RawIOBase):
+    """Readable stream that copies every byte it reads to a file and a running hash"""
+
+    def __init__(self, source: BinaryIO, sink: BinaryIO):
+        self.source = source
+        self.sink = sink
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.source.read(len(buffer))
+        if not data:
+            return 0
+        n = len(data)
+        buffer[:n] = data
+        self.sink.write(data)
+        self.digest.update(data)
+        self.bytes_read += n
+        return n
+
+    def drain(self) -> None:
+        """Copy whatever the parser did not consume"""
+        buffer = bytearray(1 << 20)
+        while self.readinto(buffer):
+            pass
+
+
+def stats_path(file_path: str) -> str:
+    """Location of the column statistics saved alongside a dataset"""
+    return os.path.splitext(file_path)[0] + '.stats.json'
+
+
+def _merge_dtype(current: Optional[str], new: str) -> str:
+    if current is None or current == new:
+        return new
+    if current in ('int64', 'float64') and new in ('int64', 'float64'):
+        return 'float64'
+    return 'object'
+
+
+class ColumnStats:
+    """Running count, min, max, mean and variance of numeric columns, merged chunk by chunk"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.numeric: Dict[str, Dict[str, float]] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self.columns = chunk.columns.tolist()
+        self.rows += len(chunk)
+
+        for col in chunk.columns:
+            self.dtypes[col] = _merge_dtype(self.dtypes.get(col), str(chunk[col].dtype))
+
+        for col in chunk.select_dtypes(include=[np.number]).columns:
+            values = chunk[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            n_b = len(values)
+            mean_b = float(values.mean())
+            m2_b = float(((values - mean_b) ** 2).sum())
+
+            stats = self.numeric.get(col)
+            if stats is None:
+                self.numeric[col] = {"count": n_b, "min": float(values.min()), "max": float(values.max()),
+                                     "mean": mean_b, "m2": m2_b}
+                continue
+
+            # Chan et al. pairwise update of mean and sum of squared deviations
+            n_a = stats["count"]
+            n = n_a + n_b
+            delta = mean_b - stats["mean"]
+            stats["mean"] += delta * n_b / n
+            stats["m2"] += m2_b + delta ** 2 * n_a * n_b / n
+            stats["count"] = n
+            stats["min"] = min(stats["min"], float(values.min()))
+            stats["max"] = max(stats["max"], float(values.max()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "columns": self.columns,
+            "dtypes": {col: self.dtypes[col] for col in self.columns},
+            "stats": {
+                col: {
+                    "count": int(stats["count"]),
+                    "min": stats["min"],
+                    "max": stats["max"],
+                    "mean": stats["mean"],
+                    "var": stats["m2"] / stats["count"]
+                }
+                for col, stats in self.numeric.items()
+            }
+        }
+
+
+def ingest_upload(stream: BinaryIO, dest_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+    """Stream an uploaded CSV to dest_path while hashing it and collecting column statistics
+
+    The body is parsed in chunks as it is written, so the upload is read exactly once
+    and never held in memory as a whole. Returns the statistics plus the content digest.
+    """
+    stats = ColumnStats()
+    with open(dest_path, 'wb') as sink:
+        tee = _TeeStream(stream, sink)
+        reader = io.BufferedReader(tee, buffer_size=1 << 20)
+        for chunk in pd.read_csv(reader, chunksize=chunk_rows):
+            stats.update(chunk)
+        tee.drain()
+
+    result = stats.to_dict()
+    result["digest"] = tee.digest.hexdigest()
+    result["bytes"] = tee.bytes_read
+    return result
+
+
+def save_stats(file_path: str, stats: Dict[str, Any]) -> None:
+    with open(stats_path(file_path), 'w') as f:
+        json.dump({**stats, "fileSize": os.path.getsize(file_path)}, f)
+
+
+def load_stats(file_path: str) -> Optional[Dict[str, Any]]:
+    """Saved statistics for a dataset, or None if missing or stale"""
+    path = stats_path(file_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        stats = json.load(f)
+    if stats.get("fileSize") != os.path.getsize(file_path):
+        return None
+    return stats
@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+BYTES_BUCKETS = tuple(2 ** exponent for exponent in range(16, 36, 2))  # 64 KB to 16 GB
+
+
+def _max_rss_bytes() -> Optional[int]:
+    """Peak resident set size of the process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Instrumentation:
+    """Cumulative wall time, CPU time and memory per named stage, rendered as Prometheus text
+
+    With trace_memory, tracemalloc runs for the life of the process and each stage records
+    its peak traced allocation above what was allocated when it started (memoryBytes). This
+    is exact for Python and NumPy allocations, including nested stages, but slows pure-Python
+    code and is shared between threads, so it is off by default. Without it, the only cheap
+    figure is how far the process's peak RSS rose during the stage (rssPeakGrowthBytes),
+    which is 0 for almost every stage once the process is warm.
+    CPU time is process-wide, so it includes native worker threads (and concurrent requests).
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.memory_key = 'memoryBytes' if trace_memory else 'rssPeakGrowthBytes'
+        self._seconds: Dict[str, _Histogram] = {}
+        self._cpu: Dict[str, float] = {}
+        self._memory: Dict[str, _Histogram] = {}
+        self._requests: Dict[Tuple[str, str, int], _Histogram] = {}
+        self._lock = threading.Lock()
+        self._traced_lock = threading.Lock()
+        self._open_stages: List[Dict[str, int]] = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _enter_traced(self) -> Dict[str, int]:
+        with self._traced_lock:
+            current, peak = tracemalloc.get_traced_memory()
+            # Stages already open keep the peak reached so far, since it is about to be reset
+            for stage in self._open_stages:
+                stage["peak"] = max(stage["peak"], peak)
+            tracemalloc.reset_peak()
+            stage = {"start": current, "peak": current}
+            self._open_stages.append(stage)
+            return stage
+
+    def _exit_traced(self, stage: Dict[str, int]) -> int:
+        with self._traced_lock:
+            peak = tracemalloc.get_traced_memory()[1]
+            self._open_stages.remove(stage)
+            return max(stage["peak"], peak) - stage["start"]
+
+    @contextmanager
+    def stage(self, name: str, record: Optional[Dict[str, Dict[str, float]]] = None):
+        """Time the enclosed block as stage name, also adding the figures to record when given"""
+        if self.trace_memory:
+            memory_start = self._enter_traced()
+        else:
+            memory_start = _max_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if self.trace_memory:
+                memory = self._exit_traced(memory_start)
+            else:
+                memory = _max_rss_bytes() - memory_start if memory_start is not None else None
+            self.observe(name, wall, cpu, memory)
+            if record is not None:
+                totals = record.setdefault(name, {"wall": 0.0, "cpu": 0.0, self.memory_key: 0})
+                totals["wall"] += wall
+                totals["cpu"] += cpu
+                if memory is not None:
+                    totals[self.memory_key] = max(totals[self.memory_key], int(memory))
+
+    def observe(self, name: str, wall: float, cpu: float, memory: Optional[float] = None) -> None:
+        with self._lock:
+            self._seconds.setdefault(name, _Histogram(SECONDS_BUCKETS)).observe(wall)
+            self._cpu[name] = self._cpu.get(name, 0.0) + cpu
+            if memory is not None:
+                self._memory.setdefault(name, _Histogram(BYTES_BUCKETS)).observe(max(memory, 0))
+
+    def observe_request(self, endpoint: str, method: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self._requests.setdefault((endpoint, method, status), _Histogram(SECONDS_BUCKETS)).observe(seconds)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            self._render_histograms(lines, 'segmentation_stage_seconds', 'Wall time per pipeline stage',
+                                    {(name,): hist for name, hist in self._seconds.items()}, ('stage',))
+            lines.append('# HELP segmentation_stage_cpu_seconds_total CPU time per pipeline stage')
+            lines.append('# TYPE segmentation_stage_cpu_seconds_total counter')
+            for name, cpu in sorted(self._cpu.items()):
+                lines.append(f'segmentation_stage_cpu_seconds_total{{stage="{name}"}} {cpu!r}')
+            if self.trace_memory:
+                memory_metric = 'segmentation_stage_memory_bytes'
+                memory_help = 'Peak traced allocation per pipeline stage'
+            else:
+                memory_metric = 'segmentation_stage_rss_peak_growth_bytes'
+                memory_help = 'Rise of the process peak RSS per pipeline stage (usually 0 once warm)'
+            self._render_histograms(lines, memory_metric, memory_help,
+                                    {(name,): hist for name, hist in self._memory.items()}, ('stage',))
+            self._render_histograms(lines, 'segmentation_http_request_seconds',
+                                    'Time to produce each API response (before streamed bodies are sent)',
+                                    self._requests, ('endpoint', 'method', 'status'))
+        lines.append('# HELP segmentation_process_max_rss_bytes Peak resident set size of the process')
+        lines.append('# TYPE segmentation_process_max_rss_bytes gauge')
+        lines.append(f'segmentation_process_max_rss_bytes {_max_rss_bytes() or 0}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines: List[str], metric: str, help_text: str,
+                           histograms: Dict[Tuple[Any, ...], _Histogram], label_names: Tuple[str, ...]) -> None:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for key, hist in sorted(histograms.items()):
+            labels = ','.join(f'{label}="{value}"' for label, value in zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(hist.buckets + (float('inf'),), hist.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{labels}}} {hist.sum!r}')
+            lines.append(f'{metric}_count{{{labels}}} {hist.count}')
+
+
+# Process-wide collector used by the model and the API
+instrumentation = Instrumentation(trace_memory=os.environ.get('TRACE_MEMORY', '').lower() in ('1', 'true'))
@@ -0,0 +1,115 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next progress checkpoint after cancellation"""
+
+
+class Job:
+    """A unit of background work with status, progress and result"""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    def update(self, **progress) -> None:
+        """Record progress; also the point where a cancelled job stops"""
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+        self.progress.update(progress)
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "jobId": self.id,
+            "type": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "elapsed": elapsed,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """In-process job store backed by a thread pool
+
+    Finished jobs are kept for later retrieval until max_finished newer ones
+    have completed.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 100):
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='segmentation-job')
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict[str, Any], func: Callable[[Job], Any]) -> Job:
+        """Queue func(job) to run on the worker pool"""
+        job = Job(kind, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job immediately or ask a running one to stop at its next checkpoint"""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job._cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return job
+
+    def _run(self, job: Job, func: Callable[[Job], Any]) -> None:
+        if job._cancel_event.is_set():
+            job.status = CANCELLED
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = func(job)
+            job.status = SUCCEEDED
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+# Share of the point budget reserved for the points farthest from their centroid
+OUTLIER_FRACTION = 0.1
+
+
+def _allocate(sizes: np.ndarray, budget: int) -> np.ndarray:
+    """Split budget across clusters in proportion to their sizes, at least one per non-empty cluster"""
+    total = sizes.sum()
+    if total <= budget:
+        return sizes.copy()
+    quota = np.floor(sizes * budget / total).astype(np.int64)
+    quota[(sizes > 0) & (quota == 0)] = 1
+    return np.minimum(quota, sizes)
+
+
+def stratified_sample(labels: np.ndarray, distances: np.ndarray, budget: int,
+                      random_state: int = 42) -> np.ndarray:
+    """Row indices of a per-cluster sample that preserves cluster proportions
+
+    Within each cluster, a slice of the quota goes to the rows farthest from the
+    centroid so outliers stay visible; the rest is drawn uniformly at random.
+    """
+    rng = np.random.RandomState(random_state)
+    n_labels = labels.max() + 1 if len(labels) else 0
+    sizes = np.bincount(labels, minlength=n_labels)
+    quota = _allocate(sizes, budget)
+
+    order = np.argsort(labels, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    selected = []
+    for i in range(n_labels):
+        members = order[starts[i]:starts[i + 1]]
+        if quota[i] >= len(members):
+            selected.append(members)
+            continue
+        n_outliers = int(quota[i] * OUTLIER_FRACTION)
+        by_distance = members[np.argsort(distances[members])[::-1]]
+        outliers = by_distance[:n_outliers]
+        rest = rng.choice(by_distance[n_outliers:], size=quota[i] - n_outliers, replace=False)
+        selected.append(np.concatenate([outliers, rest]))
+
+    return np.sort(np.concatenate(selected)) if selected else np.array([], dtype=np.int64)
+
+
+def grid_aggregate(coords: np.ndarray, labels: np.ndarray, budget: int) -> Dict[str, np.ndarray]:
+    """Aggregate points into grid cells per cluster, returning mean coordinates and counts
+
+    The grid resolution is chosen so the number of (cluster, cell) pairs stays near budget.
+    """
+    n_labels = labels.max() + 1 if len(labels) else 1
+    n_dims = coords.shape[1]
+    cells_per_axis = max(1, int((budget / n_labels) ** (1.0 / n_dims)))
+
+    low = coords.min(axis=0)
+    span = np.where(coords.max(axis=0) > low, coords.max(axis=0) - low, 1.0)
+    cell = np.minimum(((coords - low) / span * cells_per_axis).astype(np.int64), cells_per_axis - 1)
+
+    # One integer key per (cluster, cell)
+    key = labels.astype(np.int64)
+    for axis in range(n_dims):
+        key = key * cells_per_axis + cell[:, axis]
+    unique_keys, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+
+    means = np.zeros((len(unique_keys), n_dims))
+    for axis in range(n_dims):
+        means[:, axis] = np.bincount(inverse, weights=coords[:, axis], minlength=len(unique_keys)) / counts
+
+    return {
+        "coords": means,
+        "cluster": unique_keys // cells_per_axis ** n_dims,
+        "count": counts
+    }
+
+
+def in_bbox(coords: np.ndarray, bbox: Optional[List[float]]) -> np.ndarray:
+    """Mask of rows inside [min_1, ..., min_d, max_1, ..., max_d] over the first d coordinates"""
+    if not bbox:
+        return np.ones(len(coords), dtype=bool)
+    n_dims = len(bbox) // 2
+    low = np.asarray(bbox[:n_dims], dtype=float)
+    high = np.asarray(bbox[n_dims:], dtype=float)
+    return np.all((coords[:, :n_dims] >= low) & (coords[:, :n_dims] <= high), axis=1)
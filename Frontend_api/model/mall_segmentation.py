@@ -1,25 +1,88 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.metrics import silhouette_score
+from silhouette import compute_silhouette, sample_rows, DEFAULT_SAMPLE_SIZE, MAX_STREAMING_SAMPLE_SIZE
+from artifacts import SegmentationArtifact, save_artifact, load_artifact
+from ingest import load_stats
+from column_cache import cached_columns, load_column_cache
+from lod import stratified_sample, grid_aggregate, in_bbox
+from instrumentation import instrumentation
+from resources import fit_resources
+from schema import ColumnRoles, grouped_means, grouped_variances, grouped_distribution
+from compact import read_compact_csv, compact_frame, smallest_int_dtype
+from engines import FittedClusters, get_engine, resolve_algorithm, PRECISIONS, DEFAULT_ENGINE, DEFAULT_ALGORITHM, DEFAULT_INIT, DEFAULT_PRECISION
+from coreset import fit_on_sample, SAMPLE_METHODS
+from customer_index import CustomerIndex, build_customer_index
 import os
-import json
-from typing import Dict, List, Any, Optional
+import copy
+from typing import Dict, List, Any, Iterator, Optional
+
+# Rows per block when measuring distances to the assigned centroids
+_DISTANCE_BLOCK_ROWS = 100000
+
+def columns_to_records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Turn parallel column lists into a list of row objects, skipping missing values"""
+    keys = list(columns.keys())
+    return [
+        {key: value for key, value in zip(keys, row) if value is not None}
+        for row in zip(*columns.values())
+    ]
+
+def _default_features(df: pd.DataFrame, roles: Optional[ColumnRoles] = None) -> List[str]:
+    """Pick the clustering features when the caller does not specify any"""
+    roles = roles or ColumnRoles.resolve(df.columns)
+    if roles.income and roles.spending:
+        return [roles.income, roles.spending]
+    
+    # Try to infer features
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    # Exclude ID columns
+    return [col for col in numeric_cols if not ('id' in col.lower() or 'customer' in col.lower())]
 
 class MallCustomerSegmentation:
-    def __init__(self, n_clusters=5, random_state=42, max_iter=300, algorithm='auto', normalize=True):
+    def __init__(self, n_clusters=5, random_state=42, max_iter=300, algorithm=DEFAULT_ALGORITHM, normalize=True,
+                 silhouette_sample_size=DEFAULT_SAMPLE_SIZE, n_threads=None, engine=DEFAULT_ENGINE,
+                 init=DEFAULT_INIT, precision=DEFAULT_PRECISION, sample_size=None, sample_method='coreset'):
+        if algorithm != 'minibatch':
+            resolve_algorithm(algorithm)
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision must be one of {', '.join(PRECISIONS)}")
+        if sample_size is not None and sample_size < n_clusters:
+            raise ValueError("sampleSize must be at least the number of clusters")
+        if sample_method not in SAMPLE_METHODS:
+            raise ValueError(f"sampleMethod must be one of {', '.join(SAMPLE_METHODS)}")
         self.n_clusters = n_clusters
         self.random_state = random_state
         self.max_iter = max_iter
         self.algorithm = algorithm
         self.normalize = normalize
+        self.silhouette_sample_size = silhouette_sample_size
+        self.n_threads = n_threads
+        self.engine = engine
+        self.init = init
+        self.precision = precision
+        self.sample_size = sample_size
+        self.sample_method = sample_method
+        self.approximation = None
         self.model = None
-        self.scaler = StandardScaler() if normalize else None
+        self.artifact = None
+        self.scaler = None
+        if normalize:
+            # scikit-learn is imported on first use to keep API startup fast
+            from sklearn.preprocessing import StandardScaler
+            self.scaler = StandardScaler()
         self.df = None
+        self.roles = None
+        self.column_stats = None
         self.features_used = []
+        self._X = None
+        self._silhouette_cache = {}
+        self._cluster_rows = {}
+        self._customer_index = None
+        self.labels_path = None
+        self.n_rows = None
+        self._streaming_metrics = None
+        self._drift_baseline = None
+        self.timings: Dict[str, Dict[str, float]] = {}
         self.cluster_descriptions = {
             "high_income_high_spending": "Premium Shoppers: High income customers who spend generously",
             "high_income_low_spending": "Potential Shoppers: High income customers who are conservative spenders",
@@ -28,14 +91,81 @@ class MallCustomerSegmentation:
             "average_income_average_spending": "Standard Shoppers: Average income and spending habits"
         }
         
-    def load_data(self, file_path: str) -> pd.DataFrame:
-        """Load customer data from CSV file"""
+    def load_data(self, file_path: str, features: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load customer data, from the binary column cache when one exists and from the CSV otherwise
+        
+        With features given, only those columns plus the id/gender/age/income/spending columns
+        are read from the cache.
+        """
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Data file not found: {file_path}")
         
-        self.df = pd.read_csv(file_path)
+        self.df = None
+        self._X = None
+        self.roles = None
+        self.timings = {}
+        self.column_stats = load_stats(file_path)
+        with instrumentation.stage('load_data', self.timings):
+            # Cached columns are memory-mapped, so they are used in their stored dtypes
+            columns = cached_columns(file_path)
+            if columns is not None:
+                wanted = None
+                if features is not None:
+                    roles = ColumnRoles.resolve(columns).columns()
+                    wanted = [col for col in columns if col in features or col in roles]
+                self.df = load_column_cache(file_path, wanted)
+                
+            if self.df is None:
+                self.df = read_compact_csv(file_path, self.column_stats)
+        self.roles = ColumnRoles.resolve(self.df.columns)
         return self.df
     
+    def with_data_from(self, other: "MallCustomerSegmentation") -> "MallCustomerSegmentation":
+        """Share another instance's loaded frame, column roles and statistics instead of reading the file again
+        
+        The frame is a shallow copy: the column data is shared, but the Cluster column fit() adds stays
+        on this instance, so models built from the same loader keep their own labels.
+        """
+        self.df = other.df.copy(deep=False)
+        self.roles = other.roles
+        self.column_stats = other.column_stats
+        self._X = None
+        self.timings = {}
+        return self
+    
+    def _scaler_from_stats(self, features: List[str], n_rows: int) -> bool:
+        """Set the scaler from upload-time column statistics instead of another pass over the data
+        
+        Returns False (leaving the scaler untouched) when the statistics are missing or do not
+        cover every feature row.
+        """
+        stats = self.column_stats
+        if not stats or stats["rows"] != n_rows:
+            return False
+        if not all(col in stats["stats"] and stats["stats"][col]["count"] == n_rows for col in features):
+            return False
+            
+        mean = np.array([stats["stats"][col]["mean"] for col in features])
+        var = np.array([stats["stats"][col]["var"] for col in features])
+        self._set_scaler(mean, var, n_rows)
+        return True
+        
+    def _fit_scaler(self, X: np.ndarray) -> None:
+        """Fit the scaler a column at a time with float64 accumulators, without widening X"""
+        mean = np.array([X[:, j].mean(dtype=np.float64) for j in range(X.shape[1])])
+        var = np.array([X[:, j].var(dtype=np.float64) for j in range(X.shape[1])])
+        self._set_scaler(mean, var, len(X))
+        
+    def _set_scaler(self, mean: np.ndarray, var: np.ndarray, n_rows: int) -> None:
+        scale = np.sqrt(var)
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        
+        self.scaler.mean_ = mean
+        self.scaler.var_ = var
+        self.scaler.scale_ = scale
+        self.scaler.n_features_in_ = len(mean)
+        self.scaler.n_samples_seen_ = np.int64(n_rows)
+    
     def preprocess_data(self, features: Optional[List[str]] = None) -> np.ndarray:
         """Preprocess data for clustering"""
         if self.df is None:
@@ -43,61 +173,362 @@ class MallCustomerSegmentation:
         
         # Default features if none specified
         if features is None:
-            if 'Annual Income (k$)' in self.df.columns and 'Spending Score (1-100)' in self.df.columns:
-                features = ['Annual Income (k$)', 'Spending Score (1-100)']
-            elif 'annual_income' in self.df.columns and 'spending_score' in self.df.columns:
-                features = ['annual_income', 'spending_score']
-            else:
-                # Try to infer features
-                numeric_cols = self.df.select_dtypes(include=[np.number]).columns.tolist()
-                # Exclude ID columns
-                features = [col for col in numeric_cols if not ('id' in col.lower() or 'customer' in col.lower())]
+            features = _default_features(self.df, self.roles)
                 
         self.features_used = features
-        X = self.df[features].values
-        
-        # Normalize data if specified
-        if self.normalize:
-            X = self.scaler.fit_transform(X)
+        with instrumentation.stage('preprocess', self.timings):
+            X = self._feature_matrix(features)
             
+            # Normalize data if specified, reusing upload statistics when available
+            if self.normalize:
+                if not self._scaler_from_stats(features, len(X)):
+                    self._fit_scaler(X)
+                self._scale_in_place(X)
+            self._X = X
+                
         return X
     
+    def _feature_matrix(self, features: List[str]) -> np.ndarray:
+        """Features as one row-major matrix at the model precision, filled a column at a time"""
+        X = np.empty((len(self.df), len(features)), dtype=PRECISIONS[self.precision])
+        for j, col in enumerate(features):
+            X[:, j] = self.df[col].to_numpy()
+        return X
+    
+    def _scale_in_place(self, X: np.ndarray) -> None:
+        X -= self.scaler.mean_.astype(X.dtype)
+        X /= self.scaler.scale_.astype(X.dtype)
+        
+    def scaled_features(self) -> np.ndarray:
+        """The clustering matrix of the loaded data, built on first use and then cached"""
+        if self.df is None:
+            raise ValueError("No data loaded. Call load_data() first.")
+        if self._X is None or len(self._X) != len(self.df):
+            X = self._feature_matrix(self.features_used)
+            if self.normalize:
+                self._scale_in_place(X)
+            self._X = X
+        return self._X
+        
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the loaded data and the caches built from it"""
+        if self.df is None:
+            return 0
+        arrays = [self._X, *self._cluster_rows.values()]
+        if self._customer_index is not None:
+            index = self._customer_index
+            arrays += [index.ids, index.rows, index.clusters, index.distances]
+        return int(self.df.memory_usage(deep=True).sum()) + sum(array.nbytes for array in arrays if array is not None)
+    
     def fit(self, X: Optional[np.ndarray] = None, features: Optional[List[str]] = None) -> np.ndarray:
         """Fit K-means model to the data"""
         if X is None:
             X = self.preprocess_data(features)
             
-        self.model = KMeans(
-            n_clusters=self.n_clusters,
-            random_state=self.random_state,
-            max_iter=self.max_iter,
-            algorithm=self.algorithm
-        )
+        engine = get_engine(self.engine, algorithm=self.algorithm, init=self.init)
+        with fit_resources.slot(self.n_threads):
+            if self.sample_size and self.sample_size < len(X):
+                self.model, self.approximation = fit_on_sample(
+                    engine, X, self.n_clusters, self.sample_size, self.sample_method,
+                    random_state=self.random_state, max_iter=self.max_iter, timings=self.timings
+                )
+            else:
+                with instrumentation.stage('kmeans', self.timings):
+                    self.model = engine.fit(X, self.n_clusters, random_state=self.random_state,
+                                            max_iter=self.max_iter)
+                self.approximation = None
+        self.df['Cluster'] = self.model.labels_.astype(smallest_int_dtype(0, self.n_clusters - 1))
+        self._silhouette_cache = {}
+        self._cluster_rows = {}
+        self._customer_index = None
+        self._streaming_metrics = None
         
-        self.df['Cluster'] = self.model.fit_predict(X)
+        # Reference point for drift tracking in partial_update
+        self._drift_baseline = {
+            "shares": np.bincount(self.model.labels_, minlength=self.n_clusters) / len(X),
+            "inertia": self.model.inertia_ / len(X),
+            "appendedRows": 0,
+            "appendedSse": 0.0
+        }
         return self.model.labels_
     
-    def get_cluster_description(self, cluster_df: pd.DataFrame) -> str:
-        """Generate description for a cluster based on its characteristics"""
-        # Determine income level
-        if 'Annual Income (k$)' in self.df.columns:
-            income_col = 'Annual Income (k$)'
-        elif 'annual_income' in self.df.columns:
-            income_col = 'annual_income'
-        else:
-            income_col = [col for col in self.df.columns if 'income' in col.lower()][0]
+    def copy(self) -> "MallCustomerSegmentation":
+        """A copy that partial_update can change without touching this instance
+        
+        partial_update replaces the frame, the centroids and the caches rather than writing into
+        them, so those are shared; the scaler and the drift baseline, which it updates in place,
+        are copied.
+        """
+        other = copy.copy(self)
+        other.model = copy.copy(self.model)
+        other.scaler = copy.deepcopy(self.scaler)
+        other._drift_baseline = copy.deepcopy(self._drift_baseline)
+        other.timings = {}
+        return other
+    
+    def partial_update(self, new_rows: pd.DataFrame, size_threshold: float = 0.1,
+                       inertia_threshold: float = 0.25) -> Dict[str, Any]:
+        """Append customers to an in-memory fit without refitting from scratch
+        
+        New rows are assigned to the nearest centroid, then the scaler statistics and the
+        centroids are moved to include them as running means (mini-batch style); existing
+        rows keep their labels. Drift since the last full fit is measured as the shift in
+        cluster shares (total variation distance) and the relative rise in per-row inertia
+        of the appended rows. A full refit runs once either passes its threshold.
+        """
+        if self.df is None or 'Cluster' not in self.df.columns or self._drift_baseline is None:
+            raise ValueError("Incremental updates need an in-memory fit. Call fit() first.")
             
-        # Determine spending level
-        if 'Spending Score (1-100)' in self.df.columns:
-            spending_col = 'Spending Score (1-100)'
-        elif 'spending_score' in self.df.columns:
-            spending_col = 'spending_score'
+        missing = [feature for feature in self.features_used if feature not in new_rows.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        raw = new_rows[self.features_used].to_numpy(dtype=float)
+        if len(raw) == 0:
+            raise ValueError("No rows to add.")
+        if np.isnan(raw).any():
+            raise ValueError("Feature columns must not contain missing values.")
+            
+        with instrumentation.stage('partial_update', self.timings):
+            centers = self.model.cluster_centers_.astype(float)
+            if self.normalize:
+                # Re-express the centroids in the scaler's updated units
+                centers = self.scaler.inverse_transform(centers)
+                self.scaler.partial_fit(raw)
+                centers = self.scaler.transform(centers)
+                X = self.scaler.transform(raw)
+            else:
+                X = raw
+                
+            # Assign to the nearest centroid, then fold the new rows into the centroid means
+            distances = ((X[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            labels = distances.argmin(axis=1)
+            k = self.n_clusters
+            old_sizes = np.bincount(self.df['Cluster'].to_numpy(), minlength=k)
+            new_sizes = np.bincount(labels, minlength=k)
+            new_sums = np.zeros_like(centers)
+            np.add.at(new_sums, labels, X)
+            grown = new_sizes > 0
+            centers = centers.copy()
+            centers[grown] = (centers[grown] * old_sizes[grown, None] + new_sums[grown]) / (old_sizes + new_sizes)[grown, None]
+            self.model.cluster_centers_ = centers
+            
+            new_rows = new_rows.copy()
+            new_rows['Cluster'] = labels
+            roles = self.roles
+            if roles.id and roles.id not in new_rows.columns:
+                next_id = int(self.df[roles.id].max()) + 1
+                new_rows[roles.id] = range(next_id, next_id + len(new_rows))
+            self.df = compact_frame(pd.concat([self.df, new_rows], ignore_index=True))
+            # The scaler moved, so the cached matrix is rebuilt on next use
+            self._X = None
+            self._silhouette_cache = {}
+            self._cluster_rows = {}
+            self._customer_index = None
+            
+        # Drift since the last full fit
+        baseline = self._drift_baseline
+        baseline["appendedRows"] += len(X)
+        baseline["appendedSse"] += float(distances[np.arange(len(X)), labels].sum())
+        sizes = old_sizes + new_sizes
+        size_shift = float(np.abs(sizes / sizes.sum() - baseline["shares"]).sum() / 2)
+        appended_inertia = baseline["appendedSse"] / baseline["appendedRows"]
+        inertia_change = float(appended_inertia / baseline["inertia"] - 1) if baseline["inertia"] > 0 else 0.0
+        
+        report = {
+            "rowsAdded": len(X),
+            "rows": len(self.df),
+            "sizeShift": size_shift,
+            "inertiaChange": inertia_change,
+            "refit": size_shift > size_threshold or inertia_change > inertia_threshold,
+        }
+        if report["refit"]:
+            self.fit(features=self.features_used)
+            
+        report["clusterSizes"] = np.bincount(self.df['Cluster'].to_numpy(), minlength=k).tolist()
+        return report
+    
+    def fit_streaming(self, file_path: str, chunk_size: int = 100000, features: Optional[List[str]] = None,
+                      n_passes: int = 1, output_path: Optional[str] = None) -> str:
+        """Fit a mini-batch K-means model by streaming the CSV in chunks
+        
+        The file is read once to fit the scaler incrementally, n_passes times to train
+        the clusterer and once more to write the labelled rows to output_path. Only one
+        chunk (plus a bounded silhouette sample) is held in memory at a time, so the
+        full table is never loaded into self.df. Returns the path of the labelled CSV.
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Data file not found: {file_path}")
+            
+        chunk_size = max(int(chunk_size), self.n_clusters)
+        header = pd.read_csv(file_path, nrows=100)
+        if features is None:
+            features = _default_features(header)
+        self.features_used = features
+        self.df = None
+        self.timings = {}
+        self.roles = ColumnRoles.resolve(header.columns).require()
+        
+        def read_chunks():
+            return pd.read_csv(file_path, chunksize=chunk_size)
+        
+        # Pass 1: scaler statistics and row count, skipped when the upload already recorded them
+        self.column_stats = load_stats(file_path)
+        if self.column_stats and (not self.normalize or self._scaler_from_stats(features, self.column_stats["rows"])):
+            n_rows = self.column_stats["rows"]
         else:
-            spending_col = [col for col in self.df.columns if 'spend' in col.lower()][0]
+            n_rows = 0
+            with instrumentation.stage('streaming_scaler', self.timings):
+                for chunk in read_chunks():
+                    if self.normalize:
+                        self.scaler.partial_fit(chunk[features].values)
+                    n_rows += len(chunk)
+        if n_rows < self.n_clusters:
+            raise ValueError(f"Need at least {self.n_clusters} rows to fit {self.n_clusters} clusters")
+            
+        def scaled(chunk):
+            X = chunk[features].values
+            return self.scaler.transform(X) if self.normalize else X
+        
+        # Training passes: one mini-batch update per chunk
+        from sklearn.cluster import MiniBatchKMeans
+        self.model = MiniBatchKMeans(
+            n_clusters=self.n_clusters,
+            random_state=self.random_state,
+            batch_size=chunk_size,
+            n_init=3
+        )
+        pending = None
+        with fit_resources.slot(self.n_threads), instrumentation.stage('streaming_train', self.timings):
+            for _ in range(max(1, n_passes)):
+                for chunk in read_chunks():
+                    X = scaled(chunk)
+                    # The first update needs at least n_clusters rows
+                    if pending is not None:
+                        X = np.vstack([pending, X])
+                        pending = None
+                    if len(X) < self.n_clusters and not hasattr(self.model, 'cluster_centers_'):
+                        pending = X
+                        continue
+                    self.model.partial_fit(X)
+                
+        # Final pass: label every row and accumulate per-cluster aggregates
+        if output_path is None:
+            output_path = os.path.splitext(file_path)[0] + '_segmented.csv'
+        if os.path.exists(output_path):
+            os.remove(output_path)
+            
+        income_col = self.roles.income
+        spending_col = self.roles.spending
+        age_col = self.roles.age
+        gender_col = self.roles.gender
+        
+        k = self.n_clusters
+        sizes = np.zeros(k)
+        income_sums = np.zeros(k)
+        spending_sums = np.zeros(k)
+        age_sums = np.zeros(k)
+        feature_sums = np.zeros((k, len(features)))
+        feature_squares = np.zeros((k, len(features)))
+        gender_counts = [{} for _ in range(k)]
         
-        avg_income = cluster_df[income_col].mean()
-        avg_spending = cluster_df[spending_col].mean()
+        # The silhouette sample stays bounded even when an exact score (sample size 0) was asked for
+        rng = np.random.RandomState(self.random_state)
+        sample_size = min(self.silhouette_sample_size or MAX_STREAMING_SAMPLE_SIZE, MAX_STREAMING_SAMPLE_SIZE)
+        sample_rate = min(1.0, sample_size / n_rows)
+        sample_X, sample_labels = [], []
         
+        with fit_resources.slot(self.n_threads), instrumentation.stage('streaming_label', self.timings):
+            for i, chunk in enumerate(read_chunks()):
+                X = scaled(chunk)
+                labels = self.model.predict(X)
+                chunk['Cluster'] = labels
+                chunk.to_csv(output_path, mode='a', header=(i == 0), index=False)
+                
+                sizes += np.bincount(labels, minlength=k)
+                income_sums += np.bincount(labels, weights=chunk[income_col].to_numpy(dtype=float), minlength=k)
+                spending_sums += np.bincount(labels, weights=chunk[spending_col].to_numpy(dtype=float), minlength=k)
+                if age_col:
+                    age_sums += np.bincount(labels, weights=chunk[age_col].to_numpy(dtype=float), minlength=k)
+                raw = chunk[features].to_numpy(dtype=float)
+                np.add.at(feature_sums, labels, raw)
+                np.add.at(feature_squares, labels, raw ** 2)
+                if gender_col:
+                    for (cluster, gender), count in chunk.groupby(['Cluster', gender_col]).size().items():
+                        gender_counts[cluster][gender] = gender_counts[cluster].get(gender, 0) + int(count)
+                        
+                keep = rng.random_sample(len(X)) < sample_rate
+                sample_X.append(X[keep])
+                sample_labels.append(labels[keep])
+            
+        self.labels_path = output_path
+        self.n_rows = n_rows
+        with instrumentation.stage('silhouette', self.timings):
+            sample_X, sample_labels = np.vstack(sample_X), np.concatenate(sample_labels)
+            if len(sample_X) > sample_size:
+                kept = sample_rows(len(sample_X), sample_size, self.random_state)
+                sample_X, sample_labels = sample_X[kept], sample_labels[kept]
+            self._silhouette_cache = {
+                self.silhouette_sample_size: compute_silhouette(
+                    sample_X, sample_labels, sample_size=None, random_state=self.random_state
+                )
+            }
+        
+        # Cluster metrics from the accumulated sums
+        silhouette_avg = self._silhouette_cache[self.silhouette_sample_size]
+        self._streaming_metrics = []
+        for i in range(k):
+            size = sizes[i]
+            safe_size = max(size, 1)
+            variances = (feature_squares[i] - feature_sums[i] ** 2 / safe_size) / max(size - 1, 1)
+            metric = {
+                "size": int(size),
+                "avgIncome": float(income_sums[i] / safe_size),
+                "avgSpending": float(spending_sums[i] / safe_size),
+                "density": float(size / n_rows),
+                "description": self._describe_levels(income_sums[i] / safe_size, spending_sums[i] / safe_size),
+                "silhouette": float(silhouette_avg),
+                "variance": float(variances.mean()),
+            }
+            
+            if age_col:
+                metric["avgAge"] = float(age_sums[i] / safe_size)
+                
+            if gender_col:
+                metric["genderDistribution"] = {g: float(c / safe_size) for g, c in gender_counts[i].items()}
+                
+            self._streaming_metrics.append(metric)
+            
+        return output_path
+    
+    def get_silhouette_score(self, sample_size: Optional[int] = None) -> float:
+        """Silhouette score of the current fit, computed once and reused
+        
+        sample_size overrides the instance setting; pass 0 for the exact chunked score.
+        """
+        if self.model is None:
+            raise ValueError("Model not fitted. Call fit() first.")
+            
+        if sample_size is None:
+            sample_size = self.silhouette_sample_size
+            
+        if sample_size not in self._silhouette_cache:
+            if self.df is None:
+                raise ValueError("Silhouette sample size cannot be changed after a streaming fit.")
+            with instrumentation.stage('silhouette', self.timings):
+                X = self.scaled_features()
+                self._silhouette_cache[sample_size] = compute_silhouette(
+                    X, self.df['Cluster'].to_numpy(), sample_size=sample_size, random_state=self.random_state
+                )
+            
+        return self._silhouette_cache[sample_size]
+    
+    def get_cluster_description(self, cluster_df: pd.DataFrame) -> str:
+        """Generate description for a cluster based on its characteristics"""
+        roles = self.roles.require()
+        return self._describe_levels(cluster_df[roles.income].mean(), cluster_df[roles.spending].mean())
+    
+    def _describe_levels(self, avg_income: float, avg_spending: float) -> str:
+        """Map average income and spending onto a cluster description"""
         # Determine income level
         if avg_income < 40:
             income_level = "low"
@@ -122,165 +553,210 @@ class MallCustomerSegmentation:
     
     def get_cluster_metrics(self) -> List[Dict[str, Any]]:
         """Calculate metrics for each cluster"""
+        if self.df is None and self._streaming_metrics is not None:
+            return self._streaming_metrics
+            
         if self.df is None or 'Cluster' not in self.df.columns:
             raise ValueError("Model not fitted. Call fit() first.")
             
-        metrics = []
+        roles = self.roles.require()
+        k = self.n_clusters
+        labels = self.df['Cluster'].to_numpy()
+        
+        # Every aggregate below is one bincount over the rows, not one mask per cluster
+        with instrumentation.stage('cluster_metrics', self.timings):
+            sizes = np.bincount(labels, minlength=k)
+            avg_income = grouped_means(labels, self.df[roles.income].to_numpy(dtype=float), k)
+            avg_spending = grouped_means(labels, self.df[roles.spending].to_numpy(dtype=float), k)
+            variances = grouped_variances(labels, self.df[self.features_used], k)
+            avg_age = grouped_means(labels, self.df[roles.age].to_numpy(dtype=float), k) if roles.age else None
+            genders = grouped_distribution(labels, self.df[roles.gender], k) if roles.gender else None
         
-        # Determine column names
-        if 'Annual Income (k$)' in self.df.columns:
-            income_col = 'Annual Income (k$)'
-        elif 'annual_income' in self.df.columns:
-            income_col = 'annual_income'
-        else:
-            income_col = [col for col in self.df.columns if 'income' in col.lower()][0]
-            
-        if 'Spending Score (1-100)' in self.df.columns:
-            spending_col = 'Spending Score (1-100)'
-        elif 'spending_score' in self.df.columns:
-            spending_col = 'spending_score'
-        else:
-            spending_col = [col for col in self.df.columns if 'spend' in col.lower()][0]
-            
-        if 'Age' in self.df.columns:
-            age_col = 'Age'
-        elif 'age' in self.df.columns:
-            age_col = 'age'
-        else:
-            age_col = None
-            
         # Calculate silhouette score
-        X = self.df[self.features_used].values
-        if self.normalize:
-            X = self.scaler.transform(X)
-        silhouette_avg = silhouette_score(X, self.df['Cluster'])
+        silhouette_avg = self.get_silhouette_score()
         
-        for i in range(self.n_clusters):
-            cluster_df = self.df[self.df['Cluster'] == i]
-            
+        metrics = []
+        for i in range(k):
             metric = {
-                "size": len(cluster_df),
-                "avgIncome": float(cluster_df[income_col].mean()),
-                "avgSpending": float(cluster_df[spending_col].mean()),
-                "density": float(len(cluster_df) / len(self.df)),
-                "description": self.get_cluster_description(cluster_df),
+                "size": int(sizes[i]),
+                "avgIncome": float(avg_income[i]),
+                "avgSpending": float(avg_spending[i]),
+                "density": float(sizes[i] / len(labels)),
+                "description": self._describe_levels(avg_income[i], avg_spending[i]),
                 "silhouette": float(silhouette_avg),
-                "variance": float(cluster_df[self.features_used].var().mean()),
+                "variance": float(variances[i].mean()),
             }
             
-            if age_col:
-                metric["avgAge"] = float(cluster_df[age_col].mean())
+            if avg_age is not None:
+                metric["avgAge"] = float(avg_age[i])
                 
             # Gender distribution if available
-            if 'Gender' in self.df.columns or 'gender' in self.df.columns:
-                gender_col = 'Gender' if 'Gender' in self.df.columns else 'gender'
-                gender_counts = cluster_df[gender_col].value_counts(normalize=True).to_dict()
-                metric["genderDistribution"] = {k: float(v) for k, v in gender_counts.items()}
+            if genders is not None:
+                metric["genderDistribution"] = genders[i]
                 
             metrics.append(metric)
             
         return metrics
     
-    def get_results(self) -> Dict[str, Any]:
-        """Get complete segmentation results in the format expected by the frontend"""
+    def _centroid_columns(self, include_age: bool) -> Dict[str, List[Any]]:
+        """Centroids in original units as parallel columns for the cluster chart"""
+        centers = self.model.cluster_centers_.astype(float)
+        
+        # Convert back to original scale if normalized
+        if self.normalize:
+            centers = self.scaler.inverse_transform(centers)
+            
+        # For 2D visualization (and 3D if age is available)
+        n_centroids = len(centers) if centers.shape[1] >= 2 else 0
+        columns = {
+            "annualIncome": centers[:n_centroids, 0].tolist(),
+            "spendingScore": centers[:n_centroids, 1].tolist(),
+            "cluster": list(range(n_centroids)),
+            "isCentroid": [True] * n_centroids
+        }
+        
+        if include_age:
+            columns["age"] = centers[:n_centroids, 2].tolist() if centers.shape[1] >= 3 else [None] * n_centroids
+            
+        return columns
+    
+    def _get_streaming_results(self, columnar: bool) -> Dict[str, Any]:
+        """Summary results for a streaming fit, whose rows live in labels_path rather than memory"""
+        include_age = any("avgAge" in metric for metric in self._streaming_metrics)
+        clusters = self._centroid_columns(include_age)
+        
+        return {
+            "format": "columnar" if columnar else "records",
+            "customers": {} if columnar else [],
+            "clusters": clusters if columnar else columns_to_records(clusters),
+            "metrics": self._streaming_metrics,
+            "modelInfo": {
+                "algorithm": self.algorithm,
+                "k": self.n_clusters,
+                "iterations": int(self.model.n_steps_),
+                "features": self.features_used,
+                "silhouetteScore": self.get_silhouette_score(),
+                "rows": self.n_rows,
+                "labelsFile": os.path.basename(self.labels_path)
+            }
+        }
+    
+    def customer_columns(self, rows: Optional[np.ndarray] = None) -> Dict[str, List[Any]]:
+        """Customer fields as parallel lists, for all rows or only the given row indices"""
         if self.df is None or 'Cluster' not in self.df.columns:
             raise ValueError("Model not fitted. Call fit() first.")
             
-        # Determine column names
-        id_col = next((col for col in self.df.columns if 'id' in col.lower() or 'customer' in col.lower()), None)
-        if not id_col:
+        roles = self.roles.require()
+        id_col, gender_col, age_col = self._id_column(), roles.gender, roles.age
+        income_col, spending_col = roles.income, roles.spending
+        
+        def values(col):
+            column = self.df[col] if rows is None else self.df[col].iloc[rows]
+            return column.to_numpy()
+        
+        customer_columns = {
+            "customerId": values(id_col).astype(np.int64).tolist(),
+            "annualIncome": values(income_col).astype(float).tolist(),
+            "spendingScore": values(spending_col).astype(float).tolist(),
+            "cluster": values('Cluster').astype(np.int64).tolist()
+        }
+        
+        if gender_col:
+            customer_columns["gender"] = values(gender_col).tolist()
+            
+        if age_col:
+            customer_columns["age"] = values(age_col).astype(np.int64).tolist()
+            
+        return customer_columns
+    
+    def _id_column(self) -> str:
+        """Customer id column, numbering the rows from 1 when the data has none"""
+        roles = self.roles.require()
+        if not roles.id:
             self.df['CustomerID'] = range(1, len(self.df) + 1)
-            id_col = 'CustomerID'
+            roles.id = 'CustomerID'
+        return roles.id
+        
+    def customer_index(self) -> CustomerIndex:
+        """Customer id index (row, cluster and distance to centroid per customer), built once per fit"""
+        if self.df is None or 'Cluster' not in self.df.columns:
+            raise ValueError("Model not fitted. Call fit() first.")
             
-        if 'Gender' in self.df.columns:
-            gender_col = 'Gender'
-        elif 'gender' in self.df.columns:
-            gender_col = 'gender'
-        else:
-            gender_col = None
+        if self._customer_index is None:
+            with instrumentation.stage('customer_index', self.timings):
+                self._customer_index = build_customer_index(
+                    self.df[self._id_column()].to_numpy(),
+                    self.df['Cluster'].to_numpy(),
+                    self.centroid_distances(),
+                    self.n_clusters
+                )
+        return self._customer_index
+        
+    def iter_customer_chunks(self, chunk_rows: int = 10000, cluster: Optional[int] = None,
+                             start: int = 0) -> Iterator[Dict[str, List[Any]]]:
+        """Yield customer columns chunk by chunk from row index start, optionally for one cluster only"""
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be positive")
+        rows = self.cluster_rows(cluster)
+        position = int(np.searchsorted(rows, start))
+        while position < len(rows):
+            yield self.customer_columns(rows[position:position + chunk_rows])
+            position += chunk_rows
             
-        if 'Age' in self.df.columns:
-            age_col = 'Age'
-        elif 'age' in self.df.columns:
-            age_col = 'age'
-        else:
-            age_col = None
+    def cluster_rows(self, cluster: Optional[int] = None) -> np.ndarray:
+        """Sorted row indices of one cluster (or of all rows), computed once per fit"""
+        if self.df is None or 'Cluster' not in self.df.columns:
+            raise ValueError("Model not fitted. Call fit() first.")
             
-        if 'Annual Income (k$)' in self.df.columns:
-            income_col = 'Annual Income (k$)'
-        elif 'annual_income' in self.df.columns:
-            income_col = 'annual_income'
-        else:
-            income_col = [col for col in self.df.columns if 'income' in col.lower()][0]
+        if cluster not in self._cluster_rows:
+            if cluster is None:
+                self._cluster_rows[None] = np.arange(len(self.df))
+            else:
+                self._cluster_rows[cluster] = np.flatnonzero(self.df['Cluster'].to_numpy() == cluster)
+        return self._cluster_rows[cluster]
+    
+    def get_results(self, columnar: bool = False) -> Dict[str, Any]:
+        """Get complete segmentation results in the format expected by the frontend
+        
+        With columnar=True, customers and clusters are returned as parallel arrays
+        keyed by field name instead of one object per row.
+        """
+        if self.df is None and self._streaming_metrics is not None:
+            return self._get_streaming_results(columnar)
             
-        if 'Spending Score (1-100)' in self.df.columns:
-            spending_col = 'Spending Score (1-100)'
-        elif 'spending_score' in self.df.columns:
-            spending_col = 'spending_score'
-        else:
-            spending_col = [col for col in self.df.columns if 'spend' in col.lower()][0]
-            
-        # Prepare customer data
-        customers = []
-        for _, row in self.df.iterrows():
-            customer = {
-                "customerId": int(row[id_col]),
-                "annualIncome": float(row[income_col]),
-                "spendingScore": float(row[spending_col]),
-                "cluster": int(row['Cluster'])
-            }
+        if self.df is None or 'Cluster' not in self.df.columns:
+            raise ValueError("Model not fitted. Call fit() first.")
             
-            if gender_col:
-                customer["gender"] = row[gender_col]
-                
-            if age_col:
-                customer["age"] = int(row[age_col])
-                
-            customers.append(customer)
+        # Prepare customer data straight from the column arrays
+        with instrumentation.stage('results', self.timings):
+            customer_columns = self.customer_columns()
+            n_customers = len(customer_columns["cluster"])
             
-        # Prepare cluster data including centroids
-        clusters = []
-        
-        # Add centroids
-        for i, center in enumerate(self.model.cluster_centers_):
-            # Convert back to original scale if normalized
-            if self.normalize:
-                center_original = self.scaler.inverse_transform([center])[0]
-            else:
-                center_original = center
-                
-            # For 2D visualization
-            if len(center_original) >= 2:
-                clusters.append({
-                    "annualIncome": float(center_original[0]),
-                    "spendingScore": float(center_original[1]),
-                    "cluster": i,
-                    "isCentroid": True
-                })
-                
-                # For 3D visualization if age is available
-                if age_col and len(center_original) >= 3:
-                    clusters[-1]["age"] = float(center_original[2])
-            
-        # Add individual points
-        for _, row in self.df.iterrows():
-            point = {
-                "annualIncome": float(row[income_col]),
-                "spendingScore": float(row[spending_col]),
-                "cluster": int(row['Cluster']),
-                "isCentroid": False
+            # Prepare cluster data including centroids
+            centroid_columns = self._centroid_columns("age" in customer_columns)
+            cluster_columns = {
+                "annualIncome": centroid_columns["annualIncome"] + customer_columns["annualIncome"],
+                "spendingScore": centroid_columns["spendingScore"] + customer_columns["spendingScore"],
+                "cluster": centroid_columns["cluster"] + customer_columns["cluster"],
+                "isCentroid": centroid_columns["isCentroid"] + [False] * n_customers
             }
             
-            if age_col:
-                point["age"] = float(row[age_col])
+            if "age" in customer_columns:
+                cluster_columns["age"] = centroid_columns["age"] + np.asarray(customer_columns["age"], dtype=float).tolist()
+                
+            if columnar:
+                customers = customer_columns
+                clusters = cluster_columns
+            else:
+                customers = columns_to_records(customer_columns)
+                clusters = columns_to_records(cluster_columns)
                 
-            clusters.append(point)
-            
         # Calculate metrics
         metrics = self.get_cluster_metrics()
         
         # Return complete results
         return {
+            "format": "columnar" if columnar else "records",
             "customers": customers,
             "clusters": clusters,
             "metrics": metrics,
@@ -288,20 +764,132 @@ class MallCustomerSegmentation:
                 "algorithm": self.algorithm,
                 "k": self.n_clusters,
                 "iterations": self.model.n_iter_,
+                "engine": self.engine,
+                "init": self.init,
+                "precision": self.precision,
+                "converged": bool(self.model.converged_),
+                "sampling": self.approximation,
                 "features": self.features_used,
-                "silhouetteScore": float(silhouette_score(X, self.df['Cluster'])) if len(np.unique(self.df['Cluster'])) > 1 else 0
+                "silhouetteScore": self.get_silhouette_score()
             }
         }
     
-    def save_model(self, file_path: str) -> None:
-        """Save the trained model"""
+    def centroid_distances(self) -> np.ndarray:
+        """Distance from every row to its assigned centroid, in model (scaled) space"""
+        if self.df is None or 'Cluster' not in self.df.columns:
+            raise ValueError("Model not fitted. Call fit() first.")
+            
+        X = self.scaled_features()
+        labels = self.df['Cluster'].to_numpy()
+        centers = self.model.cluster_centers_.astype(X.dtype)
+        distances = np.empty(len(X))
+        for start in range(0, len(X), _DISTANCE_BLOCK_ROWS):
+            block = X[start:start + _DISTANCE_BLOCK_ROWS] - centers[labels[start:start + _DISTANCE_BLOCK_ROWS]]
+            distances[start:start + _DISTANCE_BLOCK_ROWS] = np.sqrt(np.einsum('ij,ij->i', block, block))
+        return distances
+    
+    def get_points(self, budget: int = 2000, mode: str = 'sample', bbox: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Level-of-detail points for the cluster charts, at most about budget of them
+        
+        mode 'sample' returns a stratified per-cluster sample that keeps cluster proportions
+        and the farthest outliers; mode 'grid' returns grid cells with mean position and count.
+        bbox restricts both to [minIncome, minSpending, (minAge,) maxIncome, maxSpending, (maxAge)].
+        """
+        if self.df is None or 'Cluster' not in self.df.columns:
+            raise ValueError("Point queries need an in-memory fit; not available for streaming runs.")
+            
+        roles = self.roles.require()
+        income_col, spending_col, age_col, id_col = roles.income, roles.spending, roles.age, roles.id
+        
+        coord_cols = [income_col, spending_col] + ([age_col] if age_col else [])
+        coords = self.df[coord_cols].to_numpy(dtype=float)
+        labels = self.df['Cluster'].to_numpy()
+        
+        # Viewport filter for drill-down
+        mask = in_bbox(coords, bbox)
+        rows = np.flatnonzero(mask)
+        coords, labels = coords[mask], labels[mask]
+        
+        names = ["annualIncome", "spendingScore", "age"][:len(coord_cols)]
+        points = {name: [] for name in names}
+        points["cluster"] = []
+        
+        if len(rows) and mode == 'grid':
+            cells = grid_aggregate(coords, labels, budget)
+            for axis, name in enumerate(names):
+                points[name] = cells["coords"][:, axis].tolist()
+            points["cluster"] = cells["cluster"].tolist()
+            points["count"] = cells["count"].tolist()
+        elif len(rows):
+            distances = self.centroid_distances()[mask]
+            picked = stratified_sample(labels, distances, budget, random_state=self.random_state)
+            for axis, name in enumerate(names):
+                points[name] = coords[picked, axis].tolist()
+            points["cluster"] = labels[picked].tolist()
+            if id_col:
+                points["customerId"] = self.df[id_col].to_numpy()[rows[picked]].tolist()
+                
+        return {
+            "mode": mode,
+            "budget": budget,
+            "total": int(len(rows)),
+            "returned": len(points["cluster"]),
+            "points": points,
+            "centroids": self._centroid_columns(age_col is not None)
+        }
+    
+    def save_model(self, file_path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Save the fitted pipeline (scaler, centroids, features, descriptions) as an artifact directory"""
         if self.model is None:
             raise ValueError("Model not trained. Call fit() first.")
             
-        import joblib
-        joblib.dump(self.model, file_path)
+        customers = None
+        if self.df is None and self._streaming_metrics is not None:
+            descriptions = [metric["description"] for metric in self._streaming_metrics]
+        else:
+            roles = self.roles.require()
+            labels = self.df['Cluster'].to_numpy()
+            avg_income = grouped_means(labels, self.df[roles.income].to_numpy(dtype=float), self.n_clusters)
+            avg_spending = grouped_means(labels, self.df[roles.spending].to_numpy(dtype=float), self.n_clusters)
+            descriptions = [self._describe_levels(income, spending) for income, spending in zip(avg_income, avg_spending)]
+            customers = self.customer_index()
+            
+        return save_artifact(
+            file_path,
+            features=self.features_used,
+            centroids=self.model.cluster_centers_.astype(float),
+            descriptions=descriptions,
+            scaler_mean=self.scaler.mean_ if self.normalize else None,
+            scaler_scale=self.scaler.scale_ if self.normalize else None,
+            metadata={"algorithm": self.algorithm, "engine": self.engine, "precision": self.precision,
+                      "randomState": self.random_state, **(metadata or {})},
+            customers=customers
+        )
+        
+    def load_model(self, file_path: str) -> SegmentationArtifact:
+        """Load a saved pipeline artifact and restore the fitted centroids and scaler from it
         
-    def load_model(self, file_path: str) -> None:
-        """Load a trained model"""
-        import joblib
-        self.model = joblib.load(file_path)
+        model and scaler then behave as after fit() for prediction: model.predict(scaler.transform(X))
+        and predict(X) label raw feature rows. Labels of the training rows are not restored.
+        """
+        artifact = load_artifact(file_path)
+        self.artifact = artifact
+        self.features_used = artifact.features
+        self.n_clusters = len(artifact.centroids)
+        self.model = FittedClusters(np.array(artifact.centroids), np.empty(0, dtype=np.int32), float('nan'),
+                                    0, True, artifact.manifest.get('engine', self.engine))
+        self.normalize = artifact.scaler_mean is not None
+        if self.normalize:
+            from sklearn.preprocessing import StandardScaler
+            self.scaler = StandardScaler()
+            self._set_scaler(np.array(artifact.scaler_mean), np.array(artifact.scaler_scale) ** 2, 0)
+        return artifact
+        
+    def predict(self, X: Any) -> np.ndarray:
+        """Cluster of each raw feature row (columns in features_used order), after fit() or load_model()"""
+        if self.model is None:
+            raise ValueError("Model not trained. Call fit() or load_model() first.")
+        X = np.asarray(X, dtype=float)
+        if self.normalize:
+            X = self.scaler.transform(X)
+        return self.model.predict(X)
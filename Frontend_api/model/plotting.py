@@ -0,0 +1,75 @@
+import io
+import numpy as np
+from typing import Optional
+
+PLOT_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp'
+}
+
+# Above this many points, clusters are drawn as binned densities instead of one marker per point
+DEFAULT_DENSITY_THRESHOLD = 20000
+DENSITY_BINS = 120
+
+
+def render_segments(x: np.ndarray, y: np.ndarray, labels: np.ndarray, centroids: np.ndarray,
+                    x_label: str, y_label: str, n_clusters: int, fmt: str = 'png', dpi: int = 300,
+                    width: float = 10, height: float = 8,
+                    density_threshold: Optional[int] = DEFAULT_DENSITY_THRESHOLD) -> bytes:
+    """Render the cluster scatter plot to image bytes
+
+    Uses a standalone Figure (no pyplot state), so it is safe to call from several threads.
+    When there are more than density_threshold points, each cluster is binned on a shared
+    2D grid and only occupied bins are drawn, sized by how many customers fall in them, so
+    drawing cost depends on the grid rather than on the number of rows.
+    """
+    # matplotlib is only needed here, so it is imported on first render rather than at startup
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    if density_threshold is not None and len(x) > density_threshold:
+        x_edges = np.linspace(np.nanmin(x), np.nanmax(x), DENSITY_BINS + 1)
+        y_edges = np.linspace(np.nanmin(y), np.nanmax(y), DENSITY_BINS + 1)
+        x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+        y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+        for i in range(n_clusters):
+            mask = labels == i
+            counts, _, _ = np.histogram2d(x[mask], y[mask], bins=[x_edges, y_edges])
+            xi, yi = np.nonzero(counts)
+            ax.scatter(
+                x_centers[xi],
+                y_centers[yi],
+                s=10 + 40 * np.log1p(counts[xi, yi]) / np.log1p(counts.max() or 1),
+                alpha=0.6,
+                label=f'Cluster {i+1}'
+            )
+    else:
+        # Plot each cluster
+        for i in range(n_clusters):
+            mask = labels == i
+            ax.scatter(x[mask], y[mask], s=100, label=f'Cluster {i+1}')
+
+    # Plot centroids
+    ax.scatter(
+        centroids[:, 0],
+        centroids[:, 1],
+        s=300,
+        c='black',
+        marker='*',
+        label='Centroids'
+    )
+
+    ax.set_title('Customer Segments', fontsize=16)
+    ax.set_xlabel(x_label, fontsize=14)
+    ax.set_ylabel(y_label, fontsize=14)
+    ax.legend()
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+    return buf.getvalue()
@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Callable, Optional
+
+# Rendered images kept per model; the least recently used is dropped beyond this
+MAX_PLOTS_PER_MODEL = 8
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a file's contents, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """Approximate memory held by a fitted MallCustomerSegmentation, including its cached matrices"""
+    memory_bytes = getattr(model, 'memory_bytes', None)
+    return memory_bytes() if memory_bytes is not None else 0
+
+
+class ModelEntry:
+    """A fitted model plus its serialized responses (one per response format) and rendered plots
+
+    size covers the model and everything cached on the entry. It is recomputed by refresh(),
+    which runs whenever a body or plot is attached and should be called after anything else
+    that grows the model's caches, so the registry can evict against the real footprint.
+    """
+
+    def __init__(self, model_id: str, model: Any, params: Dict[str, Any], data_file: str,
+                 on_resize: Optional[Callable[[], None]] = None):
+        self.id = model_id
+        self.model = model
+        self.params = params
+        self.data_file = data_file
+        self.bodies: Dict[str, bytes] = {}
+        self.plots: "OrderedDict[Any, bytes]" = OrderedDict()
+        self._on_resize = on_resize
+        self.size = 0
+        self.refresh()
+
+    def etag(self, response_format: str) -> str:
+        return f"{self.id}-{response_format}"
+
+    def add_body(self, response_format: str, body: bytes) -> bytes:
+        self.bodies[response_format] = body
+        self.refresh()
+        return body
+
+    def get_plot(self, key: Any) -> Optional[bytes]:
+        image = self.plots.get(key)
+        if image is not None:
+            self.plots.move_to_end(key)
+        return image
+
+    def add_plot(self, key: Any, image: bytes) -> bytes:
+        self.plots[key] = image
+        self.plots.move_to_end(key)
+        while len(self.plots) > MAX_PLOTS_PER_MODEL:
+            self.plots.popitem(last=False)
+        self.refresh()
+        return image
+
+    def refresh(self) -> None:
+        """Recompute size and let the registry evict if the budget is now exceeded"""
+        self.size = (estimate_model_bytes(self.model)
+                     + sum(len(body) for body in self.bodies.values())
+                     + sum(len(image) for image in self.plots.values()))
+        if self._on_resize is not None:
+            self._on_resize()
+
+
+class ModelRegistry:
+    """Thread-safe registry of uploaded datasets and fitted models
+
+    Models are keyed by a hash of the dataset contents and the run parameters, so the
+    same request always maps to the same id in every worker process. In-memory models
+    are evicted least-recently-used first once max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 8, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.latest_model_id: Optional[str] = None
+        self.latest_dataset_id: Optional[str] = None
+        self._models: "OrderedDict[str, ModelEntry]" = OrderedDict()
+        self._datasets: Dict[str, str] = {}
+        self._digests: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    # Datasets
+
+    def add_dataset(self, dataset_id: str, file_path: str, digest: Optional[str] = None) -> str:
+        """Register a dataset file, optionally with a content hash computed during upload"""
+        with self._lock:
+            self._datasets[dataset_id] = file_path
+            self.latest_dataset_id = dataset_id
+            if digest is not None:
+                stat = os.stat(file_path)
+                self._digests[file_path] = ((stat.st_size, stat.st_mtime_ns), digest)
+        return dataset_id
+
+    def dataset_path(self, dataset_id: Optional[str] = None) -> Optional[str]:
+        """Path of a registered dataset, or of the most recent one when no id is given"""
+        with self._lock:
+            return self._datasets.get(dataset_id or self.latest_dataset_id)
+
+    def digest(self, file_path: str) -> str:
+        """Content hash of a data file, recomputed only when size or mtime change"""
+        stat = os.stat(file_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._digests.get(file_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        value = file_digest(file_path)
+        with self._lock:
+            self._digests[file_path] = (signature, value)
+        return value
+
+    # Models
+
+    def make_key(self, file_path: str, params: Dict[str, Any]) -> str:
+        """Model id from the data file contents and the normalized parameter set"""
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.digest(file_path)}:{payload}".encode()).hexdigest()[:32]
+
+    def get(self, model_id: Optional[str] = None) -> Optional[ModelEntry]:
+        """Look up a model by id, or the most recently fitted one when no id is given"""
+        with self._lock:
+            model_id = model_id or self.latest_model_id
+            entry = self._models.get(model_id)
+            if entry is not None:
+                self._models.move_to_end(model_id)
+            return entry
+
+    def put(self, model_id: str, model: Any, params: Dict[str, Any], data_file: str) -> ModelEntry:
+        with self._lock:
+            entry = ModelEntry(model_id, model, params, data_file, on_resize=self._resized)
+            self._models[model_id] = entry
+            self._models.move_to_end(model_id)
+            self._evict()
+            return entry
+
+    def discard(self, model_id: str) -> None:
+        """Drop a model from memory, e.g. after it was updated in place under a new id"""
+        with self._lock:
+            self._models.pop(model_id, None)
+
+    def mark_latest(self, entry: ModelEntry) -> None:
+        with self._lock:
+            self.latest_model_id = entry.id
+
+    def model_ids(self) -> List[str]:
+        """Ids of the models currently held in memory"""
+        with self._lock:
+            return list(self._models)
+
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(entry.size for entry in self._models.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def _resized(self) -> None:
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_entries
+            or (self.max_bytes is not None and self.memory_usage() > self.max_bytes)
+        ):
+            self._models.popitem(last=False)
@@ -0,0 +1,79 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+from threadpoolctl import threadpool_limits
+from instrumentation import instrumentation
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respecting affinity masks where the OS exposes them)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ExecutionResources:
+    """Caps how many fits run at once and how many native threads each one may use
+
+    Every fit runs inside slot(), which waits for one of max_concurrent_fits slots and then
+    limits OpenMP threads for the calling thread (OpenMP thread counts are per calling
+    thread, so concurrent fits each keep their own limit). BLAS pools are process-wide, so
+    the BLAS limit is the smallest thread count among the fits running at the time: a fit
+    running alone gets exactly its own count, and concurrent fits never oversubscribe.
+    """
+
+    def __init__(self, max_concurrent_fits: Optional[int] = None, threads_per_fit: Optional[int] = None):
+        cpus = available_cpus()
+        self.cpus = cpus
+        self.max_concurrent_fits = max(1, max_concurrent_fits or min(4, cpus))
+        self.threads_per_fit = max(1, threads_per_fit or cpus // self.max_concurrent_fits)
+        self.active = 0
+        self._slots = threading.BoundedSemaphore(self.max_concurrent_fits)
+        self._lock = threading.Lock()
+        self._blas_requests: List[int] = []
+
+    def resolve_threads(self, n_threads: Optional[int] = None) -> int:
+        """Thread count for one fit: the requested one clamped to the available CPUs, else the default"""
+        if n_threads is None:
+            return self.threads_per_fit
+        return max(1, min(int(n_threads), self.cpus))
+
+    @contextmanager
+    def slot(self, n_threads: Optional[int] = None):
+        """Run the enclosed fit once a slot is free, with at most n_threads native threads"""
+        n_threads = self.resolve_threads(n_threads)
+        wait_start = time.perf_counter()
+        self._slots.acquire()
+        instrumentation.observe('fit_queue', time.perf_counter() - wait_start, 0.0)
+        with self._lock:
+            self.active += 1
+            self._blas_requests.append(n_threads)
+            self._apply_blas_limit()
+        try:
+            with threadpool_limits(limits=n_threads, user_api='openmp'):
+                yield n_threads
+        finally:
+            with self._lock:
+                self.active -= 1
+                self._blas_requests.remove(n_threads)
+                self._apply_blas_limit()
+            self._slots.release()
+
+    def _apply_blas_limit(self) -> None:
+        # Called with the lock held; with no fit running the pools return to the default per-fit count
+        limit = min(self._blas_requests) if self._blas_requests else self.threads_per_fit
+        threadpool_limits(limits=limit, user_api='blas')
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+# Process-wide limits shared by the model, the k sweep and the API
+fit_resources = ExecutionResources(
+    max_concurrent_fits=_env_int('FIT_CONCURRENCY'),
+    threads_per_fit=_env_int('FIT_THREADS')
+)
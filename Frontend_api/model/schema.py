@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+
+def find_column(columns: List[str], names: List[str], keyword: Optional[str] = None) -> Optional[str]:
+    """Return the first exact name present in columns, else the first column containing keyword"""
+    for name in names:
+        if name in columns:
+            return name
+    if keyword:
+        return next((col for col in columns if keyword in col.lower()), None)
+    return None
+
+
+class ColumnRoles:
+    """Which dataset column plays each customer role (id, gender, age, income, spending)
+
+    Resolved once from the header when data is loaded and reused by every method that needs
+    a role, instead of searching the column names again on each call.
+    """
+
+    def __init__(self, id: Optional[str] = None, gender: Optional[str] = None, age: Optional[str] = None,
+                 income: Optional[str] = None, spending: Optional[str] = None):
+        self.id = id
+        self.gender = gender
+        self.age = age
+        self.income = income
+        self.spending = spending
+
+    @classmethod
+    def resolve(cls, columns: List[str]) -> "ColumnRoles":
+        columns = list(columns)
+        return cls(
+            id=next((col for col in columns if 'id' in col.lower() or 'customer' in col.lower()), None),
+            gender=find_column(columns, ['Gender', 'gender']),
+            age=find_column(columns, ['Age', 'age']),
+            income=find_column(columns, ['Annual Income (k$)', 'annual_income'], 'income'),
+            spending=find_column(columns, ['Spending Score (1-100)', 'spending_score'], 'spend')
+        )
+
+    def columns(self) -> List[str]:
+        """The resolved column names, skipping roles the dataset does not have"""
+        return [col for col in (self.id, self.gender, self.age, self.income, self.spending) if col]
+
+    def require(self) -> "ColumnRoles":
+        """Raise ValueError unless the income and spending roles were found"""
+        if self.income is None or self.spending is None:
+            raise ValueError("Data needs an income and a spending score column.")
+        return self
+
+
+def grouped_means(labels: np.ndarray, values: np.ndarray, k: int) -> np.ndarray:
+    """Per-cluster means of values in one bincount pass, ignoring missing values (NaN for empty clusters)"""
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    counts = np.bincount(labels[present], minlength=k)
+    sums = np.bincount(labels[present], weights=values[present], minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+
+def grouped_variances(labels: np.ndarray, X: Any, k: int) -> np.ndarray:
+    """Per-cluster sample variance (ddof=1) of each column of X, shape (k, n_columns)
+
+    X is an array or a DataFrame; columns are widened to float64 one at a time.
+    """
+    columns = [X[col] for col in X.columns] if isinstance(X, pd.DataFrame) else np.asarray(X).T
+    sizes = np.bincount(labels, minlength=k)
+    variances = np.empty((k, len(columns)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for j, column in enumerate(columns):
+            values = np.asarray(column, dtype=float)
+            means = np.bincount(labels, weights=values, minlength=k) / sizes
+            # Centre on the cluster means before squaring to keep the sums well conditioned
+            squares = np.bincount(labels, weights=(values - means[labels]) ** 2, minlength=k)
+            variances[:, j] = np.where(sizes > 1, squares / np.maximum(sizes - 1, 1), np.nan)
+    return variances
+
+
+def grouped_distribution(labels: np.ndarray, values: pd.Series, k: int) -> List[Dict[Any, float]]:
+    """Per-cluster share of each category in values, ignoring missing values"""
+    codes, categories = pd.factorize(values)
+    present = codes >= 0
+    n_categories = len(categories)
+    counts = np.bincount(labels[present] * n_categories + codes[present],
+                         minlength=k * n_categories).reshape(k, n_categories)
+    totals = counts.sum(axis=1)
+    return [
+        {categories[c]: float(counts[i, c] / totals[i]) for c in np.argsort(-counts[i], kind='stable') if counts[i, c]}
+        for i in range(k)
+    ]
@@ -0,0 +1,115 @@
+import numpy as np
+from typing import List, Optional
+
+# Default number of rows scored when sampling, and the memory budget for one
+# block of pairwise distances in the exact mode
+DEFAULT_SAMPLE_SIZE = 10000
+DEFAULT_WORKING_MEMORY_MB = 64
+
+# Largest sample a streaming fit keeps for its silhouette, whatever sample size is requested
+MAX_STREAMING_SAMPLE_SIZE = 50000
+
+
+def sample_rows(n_rows: int, sample_size: int = DEFAULT_SAMPLE_SIZE, random_state: int = 42) -> np.ndarray:
+    """Rows scored by sampled_silhouette: the same fixed-seed sample sklearn's silhouette_score draws"""
+    return np.random.RandomState(random_state).permutation(n_rows)[:sample_size]
+
+
+def sampled_silhouette(X: np.ndarray, labels: np.ndarray, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                       random_state: int = 42) -> float:
+    """Estimate the silhouette score on a fixed-seed random sample of rows
+
+    Draws the same sample as sklearn's silhouette_score(sample_size=...), but scores it in
+    bounded-memory blocks instead of one sample_size x sample_size distance matrix.
+    """
+    if len(X) <= sample_size:
+        return chunked_silhouette(X, labels)
+    rows = sample_rows(len(X), sample_size, random_state)
+    return chunked_silhouette(np.asarray(X)[rows], np.asarray(labels)[rows])
+
+
+def chunked_silhouette(X: np.ndarray, labels: np.ndarray,
+                       working_memory_mb: int = DEFAULT_WORKING_MEMORY_MB) -> float:
+    """Exact silhouette score computed from streamed blocks of pairwise distances
+
+    Only one block of shape (chunk_rows, n_samples) is held in memory at a time,
+    so memory stays bounded by working_memory_mb rather than growing with n².
+    """
+    return silhouette_scores(X, [labels], working_memory_mb)[0]
+
+
+def silhouette_scores(X: np.ndarray, labelings: List[np.ndarray],
+                      working_memory_mb: int = DEFAULT_WORKING_MEMORY_MB) -> List[float]:
+    """Exact silhouette scores of several labelings of the same rows
+
+    Each block of pairwise distances is computed once and shared by every labeling: the
+    labelings' one-hot matrices sit side by side, so one product per block gives every
+    row's distance sums to every cluster of every labeling.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n_samples = len(X)
+    scored = []
+    offset = 0
+    for labels in labelings:
+        _, labels = np.unique(np.asarray(labels), return_inverse=True)
+        n_labels = labels.max() + 1 if n_samples else 0
+        if n_labels < 2 or n_labels >= n_samples:
+            scored.append(None)
+            continue
+        counts = np.bincount(labels, minlength=n_labels).astype(np.float64)
+        scored.append((labels, counts, offset))
+        offset += n_labels
+    totals = [0.0] * len(labelings)
+    if offset == 0:
+        return totals
+
+    one_hot = np.zeros((n_samples, offset), dtype=np.float64)
+    for entry in scored:
+        if entry is not None:
+            labels, _, first = entry
+            one_hot[np.arange(n_samples), first + labels] = 1.0
+
+    squared_norms = np.einsum('ij,ij->i', X, X)
+    chunk_rows = max(1, int(working_memory_mb * 2 ** 20 // (8 * n_samples)))
+    # Every block is built in place in one buffer, so only one is ever alive
+    buffer = np.empty((min(chunk_rows, n_samples), n_samples))
+    for start in range(0, n_samples, chunk_rows):
+        stop = min(start + chunk_rows, n_samples)
+        block = np.matmul(X[start:stop], X.T, out=buffer[:stop - start])
+        block *= -2.0
+        block += squared_norms[start:stop, None]
+        block += squared_norms[None, :]
+        np.maximum(block, 0.0, out=block)
+        np.sqrt(block, out=block)
+        rows = np.arange(stop - start)
+
+        # Sum of distances from each row to every cluster of every labeling
+        all_sums = block @ one_hot
+        for i, entry in enumerate(scored):
+            if entry is None:
+                continue
+            labels, counts, first = entry
+            cluster_sums = all_sums[:, first:first + len(counts)]
+            own = labels[start:stop]
+            own_counts = counts[own]
+
+            a = cluster_sums[rows, own] / np.maximum(own_counts - 1, 1)
+            cluster_means = cluster_sums / counts
+            cluster_means[rows, own] = np.inf
+            b = cluster_means.min(axis=1)
+
+            scores = (b - a) / np.maximum(a, b)
+            scores[own_counts == 1] = 0.0
+            totals[i] += float(np.nan_to_num(scores).sum())
+
+    return [total / n_samples for total in totals]
+
+
+def compute_silhouette(X: np.ndarray, labels: np.ndarray, sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE,
+                       random_state: int = 42) -> float:
+    """Silhouette score, sampled when sample_size is set and exact (chunked) otherwise"""
+    if len(np.unique(labels)) < 2:
+        return 0.0
+    if sample_size:
+        return sampled_silhouette(X, labels, sample_size=sample_size, random_state=random_state)
+    return chunked_silhouette(X, labels)
@@ -0,0 +1,104 @@
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from silhouette import compute_silhouette, DEFAULT_SAMPLE_SIZE
+from resources import fit_resources
+from engines import get_engine, DEFAULT_ENGINE, DEFAULT_ALGORITHM, DEFAULT_INIT
+from typing import Dict, List, Any, Callable, Optional
+
+MAX_SWEEP_K = 30
+
+
+def default_workers() -> int:
+    """Worker count used when the caller does not pick one: as many as fits may run at once"""
+    return min(4, fit_resources.max_concurrent_fits)
+
+
+def _next_centers(X: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Extend centers by one, adding the point farthest from every existing center"""
+    min_dist = np.full(len(X), np.inf)
+    for center in centers:
+        np.minimum(min_dist, ((X - center) ** 2).sum(axis=1), out=min_dist)
+    return np.vstack([centers, X[np.argmax(min_dist)]])
+
+
+def _fit_chain(X: np.ndarray, k_values: List[int], params: Dict[str, Any],
+               progress: Optional[Callable[..., None]] = None) -> List[Dict[str, Any]]:
+    """Fit consecutive k values, optionally seeding each from the previous centroids"""
+    engine = get_engine(params['engine'], algorithm=params['algorithm'], init=params['init'])
+    results = []
+    centers = None
+    for k in k_values:
+        with fit_resources.slot(params['n_threads']):
+            start = time.perf_counter()
+            initial_centers = None
+            if params['warm_start'] and centers is not None and len(centers) == k - 1:
+                initial_centers = _next_centers(X, centers)
+            model = engine.fit(X, k, random_state=params['random_state'], max_iter=params['max_iter'],
+                               initial_centers=initial_centers)
+            labels = model.labels_
+            fit_time = time.perf_counter() - start
+
+        results.append({
+            "k": k,
+            "inertia": float(model.inertia_),
+            "silhouette": compute_silhouette(X, labels, sample_size=params['silhouette_sample_size'],
+                                             random_state=params['random_state']),
+            "iterations": int(model.n_iter_),
+            "fitTime": fit_time
+        })
+        centers = model.cluster_centers_
+        if progress is not None:
+            progress(results[-1])
+    return results
+
+
+def sweep_k(X: np.ndarray, k_values: List[int], n_workers: Optional[int] = None, warm_start: bool = False,
+            executor: str = 'thread', random_state: int = 42, max_iter: int = 300,
+            algorithm: str = DEFAULT_ALGORITHM, engine: str = DEFAULT_ENGINE, init: str = DEFAULT_INIT,
+            silhouette_sample_size: Optional[int] = DEFAULT_SAMPLE_SIZE,
+            progress: Optional[Callable[..., None]] = None, n_threads: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Fit K-means for every k on an already preprocessed matrix
+
+    Every k is fitted with the same clustering engine as /api/run-model (see engines.get_engine).
+    The k values are split into contiguous runs, one per worker. With warm_start,
+    each k within a run is seeded from the centroids of the k before it. progress,
+    if given, is called with each per-k result as it completes. Every fit takes a slot
+    from fit_resources and uses at most n_threads native threads; process workers
+    each have their own slots, so there the cap applies per process.
+    """
+    k_values = sorted(k_values)
+    if not k_values:
+        return []
+    if k_values[0] < 2 or k_values[-1] > MAX_SWEEP_K or k_values[-1] >= len(X):
+        raise ValueError(f"k values must be between 2 and {min(MAX_SWEEP_K, len(X) - 1)}")
+
+    n_workers = max(1, min(n_workers or default_workers(), len(k_values)))
+    params = {
+        "warm_start": warm_start,
+        "random_state": random_state,
+        "max_iter": max_iter,
+        "algorithm": algorithm,
+        "engine": engine,
+        "init": init,
+        "silhouette_sample_size": silhouette_sample_size,
+        "n_threads": n_threads
+    }
+
+    if n_workers == 1:
+        return _fit_chain(X, k_values, params, progress)
+
+    chains = [chain.tolist() for chain in np.array_split(k_values, n_workers)]
+    if executor == 'process':
+        # Callbacks cannot cross process boundaries, so report each chain as it finishes
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_fit_chain, X, chain, params) for chain in chains]
+            if progress is not None:
+                for future in as_completed(futures):
+                    for result in future.result():
+                        progress(result)
+            return [result for future in futures for result in future.result()]
+
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(_fit_chain, X, chain, params, progress) for chain in chains]
+        return [result for future in futures for result in future.result()]
@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+# (income range, spending range) of the five segments in the sample data
+SEGMENTS = [
+    ((80, 140), (70, 100)),  # High income, high spending
+    ((80, 140), (1, 30)),    # High income, low spending
+    ((15, 40), (70, 100)),   # Low income, high spending
+    ((15, 40), (1, 30)),     # Low income, low spending
+    ((40, 80), (30, 70))     # Average income, average spending
+]
+
+
+def _segment_ranges(n_clusters: int, rng: np.random.RandomState) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """The sample-data segments, plus random boxes in the same value ranges when more clusters are asked for"""
+    ranges = SEGMENTS[:n_clusters]
+    while len(ranges) < n_clusters:
+        income = int(rng.randint(15, 120))
+        spending = int(rng.randint(1, 80))
+        ranges.append(((income, income + 20), (spending, spending + 20)))
+    return ranges
+
+
+def generate_customers(n_rows: int = 200, n_clusters: int = 5, n_extra_features: int = 0,
+                       random_state: Optional[int] = None, start_id: int = 1, layout_seed: int = 0) -> pd.DataFrame:
+    """Synthetic mall customers with n_clusters segments in equal contiguous blocks of rows
+
+    With the defaults this is the 200-row sample dataset. Extra numeric features are named
+    'Feature 1', 'Feature 2', ... and are shifted per segment so they carry cluster structure too.
+    Segment positions depend only on layout_seed, so separately generated chunks share them.
+    """
+    rng = np.random.RandomState(random_state)
+    layout = np.random.RandomState(layout_seed)
+    ranges = _segment_ranges(n_clusters, layout)
+
+    df = pd.DataFrame({
+        'CustomerID': np.arange(start_id, start_id + n_rows),
+        'Gender': rng.choice(['Male', 'Female'], size=n_rows),
+        'Age': rng.randint(18, 70, size=n_rows)
+    })
+
+    # Create some patterns in the data to make clustering more meaningful
+    segment = np.arange(n_rows) * n_clusters // max(n_rows, 1)
+    income = np.empty(n_rows, dtype=np.int64)
+    spending = np.empty(n_rows, dtype=np.int64)
+    for i, ((income_low, income_high), (spending_low, spending_high)) in enumerate(ranges):
+        rows = segment == i
+        income[rows] = rng.randint(income_low, income_high, size=rows.sum())
+        spending[rows] = rng.randint(spending_low, spending_high, size=rows.sum())
+    df['Annual Income (k$)'] = income
+    df['Spending Score (1-100)'] = spending
+
+    if n_extra_features:
+        offsets = layout.uniform(-3, 3, size=(n_clusters, n_extra_features))
+        extra = rng.standard_normal((n_rows, n_extra_features)) + offsets[segment]
+        for j in range(n_extra_features):
+            df[f'Feature {j + 1}'] = extra[:, j]
+
+    return df
+
+
+def write_customers_csv(file_path: str, n_rows: int, n_clusters: int = 5, n_extra_features: int = 0,
+                        random_state: Optional[int] = 0, chunk_rows: int = 1000000) -> str:
+    """Write a synthetic dataset of any size to CSV, generating at most chunk_rows rows at a time
+
+    Each chunk carries every segment, so any prefix of the file has the full cluster structure.
+    """
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    rng = np.random.RandomState(random_state)
+    with open(file_path, 'w', newline='') as f:
+        for start in range(0, max(n_rows, 1), chunk_rows):
+            rows = min(chunk_rows, n_rows - start)
+            chunk = generate_customers(rows, n_clusters=n_clusters, n_extra_features=n_extra_features,
+                                       random_state=rng.randint(2 ** 31 - 1), start_id=start + 1)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    return file_path
@@ -0,0 +1,40 @@
+import io
+import os
+import sys
+from collections import OrderedDict
+
+import pytest
+
+# The model modules import each other by bare name, as they do when api.py is run from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry import ModelRegistry
+from synthetic import generate_customers
+
+
+@pytest.fixture
+def api_module(tmp_path, monkeypatch):
+    """api with its data directory, registry and open artifacts private to one test"""
+    monkeypatch.chdir(tmp_path)
+    import api
+    os.makedirs(api.MODEL_DIR, exist_ok=True)
+    os.makedirs(api.DATASET_DIR, exist_ok=True)
+    monkeypatch.setattr(api, 'registry', ModelRegistry())
+    monkeypatch.setattr(api, 'loaded_artifacts', OrderedDict())
+    return api
+
+
+@pytest.fixture
+def client(api_module):
+    return api_module.app.test_client()
+
+
+@pytest.fixture
+def dataset_id(client):
+    """Upload 500 synthetic customers and return the dataset id"""
+    buffer = io.StringIO()
+    generate_customers(500, random_state=0).to_csv(buffer, index=False)
+    response = client.post('/api/upload', data={'file': (io.BytesIO(buffer.getvalue().encode()), 'customers.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    return response.json['datasetId']
@@ -0,0 +1,66 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from artifacts import load_artifact
+from mall_segmentation import MallCustomerSegmentation
+from synthetic import generate_customers
+
+
+@pytest.fixture
+def saved(tmp_path):
+    data_file = tmp_path / 'customers.csv'
+    generate_customers(300, random_state=0).to_csv(data_file, index=False)
+    model = MallCustomerSegmentation(n_clusters=5)
+    model.load_data(str(data_file))
+    model.fit()
+    path = str(tmp_path / 'model')
+    model.save_model(path, metadata={"params": {"clusters": 5}})
+    return model, path
+
+
+def test_artifact_round_trip_predicts_the_fitted_labels(saved):
+    model, path = saved
+    artifact = load_artifact(path)
+    assert artifact.features == model.features_used
+    assert artifact.manifest["params"] == {"clusters": 5}
+    assert len(artifact.customers) == 300
+    labels, distances = artifact.predict(model.df[model.features_used].to_numpy(dtype=float))
+    np.testing.assert_array_equal(labels, model.df['Cluster'].to_numpy())
+    assert (distances >= 0).all()
+
+
+def test_load_model_restores_model_and_scaler(saved):
+    model, path = saved
+    raw = model.df[model.features_used].to_numpy(dtype=float)
+    loaded = MallCustomerSegmentation()
+    loaded.load_model(path)
+    assert loaded.n_clusters == 5
+    np.testing.assert_allclose(loaded.scaler.mean_, model.scaler.mean_)
+    np.testing.assert_array_equal(loaded.model.predict(loaded.scaler.transform(raw)), model.df['Cluster'].to_numpy())
+    np.testing.assert_array_equal(loaded.predict(raw), model.df['Cluster'].to_numpy())
+
+
+def test_failed_save_keeps_the_previous_artifact(saved, monkeypatch):
+    model, path = saved
+    monkeypatch.setattr(model, 'customer_index', lambda: (_ for _ in ()).throw(RuntimeError('disk full')))
+    with pytest.raises(RuntimeError):
+        model.save_model(path)
+    assert load_artifact(path).features == model.features_used
+
+
+def test_predict_endpoint_takes_json_rows_and_csv(client, dataset_id):
+    client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 4})
+    rows = [{'Annual Income (k$)': 20, 'Spending Score (1-100)': 90}, {'Annual Income (k$)': 120, 'Spending Score (1-100)': 10}]
+    from_json = client.post('/api/predict', json={'rows': rows}).json
+    assert len(from_json['cluster']) == 2 and len(from_json['distance']) == 2
+
+    csv = 'Annual Income (k$),Spending Score (1-100)\n20,90\n120,10\n'
+    from_csv = client.post('/api/predict', data=csv, content_type='text/csv').json
+    assert from_csv['cluster'] == from_json['cluster']
+
+    missing = client.post('/api/predict', json={'rows': [{'Annual Income (k$)': 20}]})
+    assert missing.status_code == 400
+    assert client.post('/api/predict?modelId=unknown', json={'rows': rows}).status_code == 404
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from batch import expand_grid
+
+INCOME_AND_SCORE = ['Annual Income (k$)', 'Spending Score (1-100)']
+AGE_AND_SCORE = ['Age', 'Spending Score (1-100)']
+
+
+def test_expand_grid_puts_feature_sets_outermost():
+    configs = expand_grid([3, 4], [0, 1], 2)
+    assert len(configs) == 8
+    assert [config["featureSet"] for config in configs] == [0] * 4 + [1] * 4
+    with pytest.raises(ValueError):
+        expand_grid([], [0], 1)
+
+
+def test_best_is_kept_per_feature_set_with_its_own_labels(api_module, client, dataset_id):
+    response = client.post('/api/run-batch', json={
+        'datasetId': dataset_id, 'clusters': [3, 5], 'featureSets': [INCOME_AND_SCORE, AGE_AND_SCORE]
+    })
+    assert response.status_code == 200, response.json
+    best = response.json['best']
+    assert [entry['featureSet'] for entry in best] == [0, 1]
+    assert len(response.json['results']['silhouette']) == 4
+
+    entries = [api_module.registry.get(entry['modelId']) for entry in best]
+    assert entries[0].model.df is not entries[1].model.df
+    for entry, winner in zip(entries, best):
+        assert entry.model.n_clusters == winner['clusters']
+        np.testing.assert_array_equal(entry.model.df['Cluster'].to_numpy(), entry.model.model.labels_)
+    assert api_module.registry.latest_model_id == best[0]['modelId']
@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from column_cache import build_column_cache, cached_columns, load_column_cache
+from ingest import ingest_upload
+from mall_segmentation import MallCustomerSegmentation
+from synthetic import generate_customers
+
+
+def _cached_dataset(tmp_path, df):
+    path = tmp_path / 'data.csv'
+    stats = ingest_upload(io.BytesIO(df.to_csv(index=False).encode()), str(path))
+    build_column_cache(str(path), stats, chunk_rows=50)
+    return str(path)
+
+
+def test_cache_round_trips_the_csv(tmp_path):
+    df = generate_customers(300, random_state=3)
+    df.loc[5, 'Gender'] = np.nan
+    path = _cached_dataset(tmp_path, df)
+
+    cached = load_column_cache(path)
+    assert cached_columns(path) == df.columns.tolist()
+    assert len(cached) == 300
+    # Integers are narrowed to the smallest dtype that holds their range
+    assert cached['Age'].dtype.itemsize < 8
+    assert isinstance(cached['Gender'].dtype, pd.CategoricalDtype)
+    assert pd.isna(cached['Gender'][5])
+    expected = pd.read_csv(path)
+    for col in df.columns:
+        assert cached[col].astype(object).where(cached[col].notna(), None).tolist() == \
+            expected[col].astype(object).where(expected[col].notna(), None).tolist()
+
+
+def test_cache_reads_only_requested_columns(tmp_path):
+    path = _cached_dataset(tmp_path, generate_customers(100, random_state=4))
+    assert load_column_cache(path, ['Age']).columns.tolist() == ['Age']
+    assert load_column_cache(path, ['Age', 'missing']) is None
+
+
+def test_stale_cache_is_ignored(tmp_path):
+    path = _cached_dataset(tmp_path, generate_customers(100, random_state=5))
+    with open(path, 'a') as f:
+        f.write('999,Male,30,50,50\n')
+    assert cached_columns(path) is None
+    assert load_column_cache(path) is None
+    # The model falls back to parsing the CSV
+    model = MallCustomerSegmentation()
+    assert len(model.load_data(path)) == 101
+
+
+def test_model_loads_from_the_cache(tmp_path):
+    path = _cached_dataset(tmp_path, generate_customers(200, random_state=6))
+    model = MallCustomerSegmentation()
+    df = model.load_data(path)
+    assert isinstance(df['Gender'].dtype, pd.CategoricalDtype)
+    assert df['Annual Income (k$)'].tolist() == pd.read_csv(path)['Annual Income (k$)'].tolist()
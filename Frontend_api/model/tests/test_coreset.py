@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from coreset import draw_sample, fit_on_sample
+from engines import get_engine
+
+
+def _blobs(n=20000, k=5, seed=0):
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform(-20, 20, size=(k, 2))
+    return (centers[rng.randint(0, k, n)] + rng.randn(n, 2)).astype(np.float64)
+
+
+@pytest.mark.parametrize('method', ['coreset', 'uniform'])
+def test_sample_weights_estimate_full_sums(method):
+    X = _blobs()
+    rows, weights = draw_sample(X, 2000, method, random_state=1)
+    assert np.all(np.diff(rows) > 0)
+    assert abs(weights.sum() / len(X) - 1) < 0.1
+    weighted_mean = (weights[:, None] * X[rows]).sum(axis=0) / weights.sum()
+    assert np.allclose(weighted_mean, X.mean(axis=0), atol=1.0)
+
+
+def test_draw_sample_rejects_unknown_methods():
+    with pytest.raises(ValueError):
+        draw_sample(np.zeros((10, 2)), 5, 'stratified')
+
+
+def test_sampled_fit_labels_every_row_close_to_a_full_fit():
+    X = _blobs()
+    engine = get_engine('sklearn')
+    fitted, report = fit_on_sample(engine, X, 5, 1000, random_state=0)
+    full = engine.fit(X, 5, random_state=0)
+    assert len(fitted.labels_) == len(X)
+    assert report["rows"] == len(X) and report["sampleSize"] == 1000
+    assert fitted.inertia_ <= full.inertia_ * 1.05
+    assert 0.95 < report["inertiaRatio"] < 1.1
+
+
+def test_run_model_reports_sampling(client, dataset_id):
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 4,
+                                                   'sampleSize': 200, 'sampleMethod': 'uniform'})
+    assert response.status_code == 200, response.json
+    sampling = response.json['modelInfo']['sampling']
+    assert sampling['method'] == 'uniform' and sampling['rows'] == 500
+    assert len(response.json['customers']) == 500
+
+    for body in ({'sampleSize': 2}, {'sampleSize': 200, 'sampleMethod': 'nope'}):
+        response = client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 4, **body})
+        assert response.status_code == 400
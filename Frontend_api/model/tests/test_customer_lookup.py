@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from customer_index import build_customer_index, save_customer_index, load_customer_index
+
+
+def test_index_finds_rows_of_unsorted_ids_and_first_of_duplicates(tmp_path):
+    ids = np.array([30, 10, 20, 10])
+    index = build_customer_index(ids, np.array([0, 1, 2, 3]), np.array([0.5, 1.5, 2.5, 3.5]), n_clusters=4)
+    save_customer_index(str(tmp_path), index)
+    loaded = load_customer_index(str(tmp_path))
+    assert isinstance(loaded.ids, np.memmap)
+
+    positions, found = loaded.lookup(np.array([10, 20, 30, 40, 5]))
+    assert found.tolist() == [True, True, True, False, False]
+    assert loaded.rows[positions[found]].tolist() == [1, 2, 0]
+    assert loaded.clusters[positions[found]].tolist() == [1, 2, 0]
+    assert loaded.distances[positions[found]].tolist() == [1.5, 2.5, 0.5]
+
+
+def test_missing_index_loads_as_none(tmp_path):
+    assert load_customer_index(str(tmp_path)) is None
+
+
+@pytest.fixture
+def model_id(client, dataset_id):
+    return client.post('/api/run-model', json={'datasetId': dataset_id}).json['modelInfo']['modelId']
+
+
+def test_single_and_bulk_lookups_agree_with_the_fit(client, model_id):
+    customers = client.get(f'/api/segmentation/customers?modelId={model_id}&limit=5').json['customers']
+    single = client.get(f'/api/customers/{customers[3]["customerId"]}?modelId={model_id}').json
+    assert single['cluster'] == customers[3]['cluster']
+
+    bulk = client.post(f'/api/customers/lookup?modelId={model_id}', json={'ids': [1, 2, 9999]}).json
+    assert bulk['customerId'] == [1, 2]
+    assert bulk['cluster'] == [customer['cluster'] for customer in customers[:2]]
+    assert bulk['missing'] == [9999]
+    assert client.get(f'/api/customers/9999?modelId={model_id}').status_code == 404
+
+
+def test_lookups_reject_ids_that_are_not_integers(client, model_id):
+    for ids in ([1.5], [2.0], [True], ['3'], [10 ** 30]):
+        assert client.post('/api/customers/lookup', json={'ids': ids}).status_code == 400
+    for customer_id in ('abc', '1.5', '99999999999999999999'):
+        assert client.get(f'/api/customers/{customer_id}').status_code == 400
+
+
+def test_open_artifacts_are_bounded(api_module, client, dataset_id, monkeypatch):
+    monkeypatch.setattr(api_module, 'MAX_LOADED_ARTIFACTS', 2)
+    model_ids = []
+    for k in (3, 4, 5):
+        model_ids.append(client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': k})
+                         .json['modelInfo']['modelId'])
+        assert client.get(f'/api/customers/1?modelId={model_ids[-1]}').status_code == 200
+    assert list(api_module.loaded_artifacts) == model_ids[1:]
@@ -0,0 +1,45 @@
+import os
+
+
+def saved_ids(api_module):
+    return {name for name in os.listdir(api_module.MODEL_DIR) if not name.endswith('.tmp')}
+
+
+def test_oldest_saved_models_are_pruned_past_the_budget(api_module, client, dataset_id, monkeypatch):
+    model_ids = [client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': k}).json['modelInfo']['modelId']
+                 for k in (3, 4)]
+    one_model = api_module.saved_model_bytes(model_ids[0])
+    monkeypatch.setattr(api_module, 'MODEL_DISK_BUDGET', int(one_model * 1.5))
+    api_module.registry.clear()
+
+    newest = client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 5}).json['modelInfo']['modelId']
+    assert saved_ids(api_module) == {newest}
+    assert client.get(f'/api/customers/1?modelId={model_ids[0]}').status_code == 404
+
+
+def test_models_held_in_memory_are_never_pruned(api_module, client, dataset_id, monkeypatch):
+    monkeypatch.setattr(api_module, 'MODEL_DISK_BUDGET', 0)
+    model_ids = [client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': k}).json['modelInfo']['modelId']
+                 for k in (3, 4)]
+    assert saved_ids(api_module) == set(model_ids)
+
+
+def test_pruned_streaming_runs_and_updates_take_their_files(api_module, client, dataset_id, monkeypatch):
+    streaming = client.post('/api/run-model', json={'datasetId': dataset_id, 'algorithm': 'minibatch',
+                                                    'chunkSize': 100}).json['modelInfo']['modelId']
+    labels_path = os.path.join('data', f'segmented_{streaming}.csv')
+    assert os.path.exists(labels_path)
+
+    base = client.post('/api/run-model', json={'datasetId': dataset_id}).json['modelInfo']['modelId']
+    rows = [{'Annual Income (k$)': 50, 'Spending Score (1-100)': 50}]
+    updated = client.post(f'/api/update-model?modelId={base}&sizeThreshold=1&inertiaThreshold=100',
+                          json={'rows': rows}).json['modelId']
+    delta_file = api_module.registry.get(updated).params['updates'][0]['file']
+    assert os.path.exists(delta_file)
+
+    monkeypatch.setattr(api_module, 'MODEL_DISK_BUDGET', 0)
+    api_module.registry.clear()
+    api_module.prune_saved_models()
+    assert saved_ids(api_module) == set()
+    assert not os.path.exists(labels_path)
+    assert not os.path.exists(delta_file)
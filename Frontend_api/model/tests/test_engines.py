@@ -0,0 +1,73 @@
+import io
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from engines import (NumpyEngine, SklearnEngine, resolve_algorithm, default_n_init, DEFAULT_N_INIT, LARGE_N_INIT,
+                     LARGE_N_INIT_ROWS)
+
+
+@pytest.fixture
+def X():
+    X, _ = make_blobs(n_samples=2000, centers=6, n_features=4, random_state=3)
+    return X
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_elkan_matches_lloyd_from_the_same_centers(X, dtype):
+    X = X.astype(dtype)
+    start = X[np.random.RandomState(0).choice(len(X), 6, replace=False)]
+    lloyd = NumpyEngine(algorithm='lloyd').fit(X, 6, initial_centers=start, tol=0)
+    elkan = NumpyEngine(algorithm='elkan').fit(X, 6, initial_centers=start, tol=0)
+    np.testing.assert_array_equal(elkan.labels_, lloyd.labels_)
+    np.testing.assert_allclose(elkan.cluster_centers_, lloyd.cluster_centers_, rtol=1e-5)
+    assert elkan.inertia_ == pytest.approx(lloyd.inertia_, rel=1e-6)
+
+
+def test_numpy_lloyd_matches_sklearn_from_the_same_centers(X):
+    start = X[:6]
+    ours = NumpyEngine(algorithm='lloyd').fit(X, 6, initial_centers=start, tol=0)
+    theirs = SklearnEngine(algorithm='lloyd').fit(X, 6, initial_centers=start, tol=0)
+    np.testing.assert_array_equal(ours.labels_, theirs.labels_)
+    assert ours.inertia_ == pytest.approx(theirs.inertia_, rel=1e-9)
+
+
+def test_resolve_algorithm():
+    assert resolve_algorithm('auto') == 'lloyd'
+    assert resolve_algorithm('full') == 'lloyd'
+    assert resolve_algorithm('elkan') == 'elkan'
+    with pytest.raises(ValueError):
+        resolve_algorithm('minibatch')
+
+
+def test_default_seedings_depend_on_size():
+    assert default_n_init(1000) == DEFAULT_N_INIT
+    assert default_n_init(LARGE_N_INIT_ROWS + 1) == LARGE_N_INIT
+
+
+def test_default_numpy_fit_matches_default_sklearn_fit(X):
+    X = X.astype(np.float32)
+    for k in (4, 6, 9):
+        numpy_inertia = NumpyEngine().fit(X, k, random_state=0).inertia_
+        sklearn_inertia = SklearnEngine().fit(X, k, random_state=0).inertia_
+        assert numpy_inertia <= sklearn_inertia * 1.01
+
+
+@pytest.mark.parametrize('engine', [NumpyEngine, SklearnEngine])
+def test_missing_values_are_rejected(X, engine):
+    X = X.copy()
+    X[5, 1] = np.nan
+    with pytest.raises(ValueError, match='NaN'):
+        engine().fit(X, 3)
+
+
+@pytest.mark.parametrize('engine', ['numpy', 'sklearn'])
+def test_run_model_rejects_missing_feature_values(client, engine):
+    csv = 'CustomerID,Gender,Age,Annual Income (k$),Spending Score (1-100)\n' + ''.join(
+        f'{i},Male,{20 + i},{"" if i == 3 else 30 + i},{i * 7 % 100}\n' for i in range(1, 21))
+    response = client.post('/api/upload', data={'file': (io.BytesIO(csv.encode()), 'missing.csv')},
+                           content_type='multipart/form-data')
+    dataset_id = response.json['datasetId']
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 3, 'engine': engine})
+    assert response.status_code == 400
+    assert 'NaN' in response.json['error']
@@ -0,0 +1,60 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def model_id(client, dataset_id):
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 4})
+    return response.json['modelInfo']['modelId']
+
+
+@pytest.fixture
+def streaming_model_id(client, dataset_id):
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'algorithm': 'minibatch',
+                                                   'chunkSize': 100, 'clusters': 4})
+    assert response.status_code == 200, response.json
+    return response.json['modelInfo']['modelId']
+
+
+def _export(client, query):
+    response = client.get(f'/api/export-csv?{query}')
+    assert response.status_code == 200, response.data[:200]
+    return response
+
+
+def test_csv_export_matches_across_chunk_sizes(client, model_id):
+    whole = pd.read_csv(io.BytesIO(_export(client, f'modelId={model_id}').data))
+    chunked = pd.read_csv(io.BytesIO(_export(client, f'modelId={model_id}&chunkSize=37').data))
+    assert len(whole) == 500
+    assert 'Cluster' in whole.columns
+    pd.testing.assert_frame_equal(whole, chunked)
+
+
+def test_gzip_csv_export_selects_columns_and_cluster(client, model_id):
+    response = _export(client, f'modelId={model_id}&compression=gzip&columns=CustomerID,Cluster&cluster=1')
+    assert response.mimetype == 'application/gzip'
+    assert 'customer_segments.csv.gz' in response.headers['Content-Disposition']
+    frame = pd.read_csv(io.BytesIO(gzip.decompress(response.data)))
+    assert frame.columns.tolist() == ['CustomerID', 'Cluster']
+    assert len(frame) > 0 and (frame['Cluster'] == 1).all()
+
+
+def test_parquet_export_keeps_dtypes(client, model_id, streaming_model_id):
+    pytest.importorskip('pyarrow')
+    for mid in (model_id, streaming_model_id):
+        response = _export(client, f'modelId={mid}&format=parquet&chunkSize=64')
+        frame = pd.read_parquet(io.BytesIO(response.data))
+        csv = pd.read_csv(io.BytesIO(_export(client, f'modelId={mid}').data))
+        assert len(frame) == 500
+        assert frame['Cluster'].dtype.kind == 'i'
+        assert frame['CustomerID'].tolist() == csv['CustomerID'].tolist()
+
+
+@pytest.mark.parametrize('query', ['format=xml', 'compression=zip', 'chunkSize=0', 'columns=Nope'])
+def test_export_rejects_bad_parameters(client, model_id, query):
+    response = client.get(f'/api/export-csv?modelId={model_id}&{query}')
+    assert response.status_code == 400
+    assert 'error' in response.json
@@ -0,0 +1,56 @@
+import hashlib
+import io
+import os
+
+import numpy as np
+
+from ingest import ingest_upload, save_stats, load_stats
+from synthetic import generate_customers
+
+
+def test_chunked_stats_match_the_whole_table(tmp_path):
+    df = generate_customers(1000, random_state=1)
+    df.loc[::7, 'Age'] = np.nan
+    body = df.to_csv(index=False).encode()
+    dest = tmp_path / 'data.csv'
+    stats = ingest_upload(io.BytesIO(body), str(dest), chunk_rows=64)
+
+    assert dest.read_bytes() == body
+    assert stats["digest"] == hashlib.sha256(body).hexdigest()
+    assert stats["bytes"] == len(body)
+    assert stats["rows"] == 1000
+    assert stats["columns"] == df.columns.tolist()
+    for col, column_stats in stats["stats"].items():
+        values = df[col].dropna()
+        assert column_stats["count"] == len(values)
+        assert column_stats["min"] == values.min() and column_stats["max"] == values.max()
+        assert np.isclose(column_stats["mean"], values.mean())
+        assert np.isclose(column_stats["var"], values.var(ddof=0))
+
+
+def test_saved_stats_go_stale_when_the_file_changes(tmp_path):
+    dest = tmp_path / 'data.csv'
+    stats = ingest_upload(io.BytesIO(b'a,b\n1,2\n3,4\n'), str(dest))
+    save_stats(str(dest), stats)
+    assert load_stats(str(dest))["rows"] == 2
+    dest.write_bytes(b'a,b\n1,2\n3,4\n5,6\n')
+    assert load_stats(str(dest)) is None
+
+
+def test_upload_returns_stats_and_dedupes_by_content(client):
+    body = generate_customers(300, random_state=2).to_csv(index=False).encode()
+    first = client.post('/api/upload?filename=a.csv', data=body, content_type='text/csv')
+    second = client.post('/api/upload', data={'file': (io.BytesIO(body), 'b.csv')},
+                         content_type='multipart/form-data')
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json["datasetId"] == second.json["datasetId"]
+    assert first.json["rows"] == 300
+    assert first.json["stats"]["Annual Income (k$)"]["count"] == 300
+
+
+def test_upload_rejects_unparseable_files(client, api_module):
+    response = client.post('/api/upload?filename=bad.csv', data=b'', content_type='text/csv')
+    assert response.status_code == 400
+    assert 'error' in response.json
+    # The partial upload is removed
+    assert os.listdir(api_module.DATASET_DIR) == []
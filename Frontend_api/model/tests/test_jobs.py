@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobManager, SUCCEEDED, FAILED, CANCELLED, FINISHED_STATES
+
+
+def _wait(get_status, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = get_status()
+        if status in FINISHED_STATES:
+            return status
+        time.sleep(0.02)
+    raise AssertionError('job did not finish')
+
+
+def test_jobs_record_results_and_errors():
+    manager = JobManager(max_workers=1)
+    ok = manager.submit('ok', {}, lambda job: 42)
+    bad = manager.submit('bad', {}, lambda job: 1 / 0)
+    assert _wait(lambda: ok.status) == SUCCEEDED and ok.result == 42
+    assert _wait(lambda: bad.status) == FAILED and 'division' in bad.error
+
+
+def test_running_job_stops_at_its_next_checkpoint():
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while True:
+            job.update(step=1)
+            time.sleep(0.01)
+
+    job = manager.submit('loop', {}, work)
+    started.wait(5)
+    manager.cancel(job.id)
+    assert _wait(lambda: job.status) == CANCELLED
+
+
+def test_finished_jobs_are_pruned_oldest_first():
+    manager = JobManager(max_workers=1, max_finished=2)
+    jobs = [manager.submit('ok', {}, lambda job: None) for _ in range(3)]
+    for job in jobs:
+        _wait(lambda: job.status)
+    manager.submit('ok', {}, lambda job: None)
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[2].id) is not None
+
+
+@pytest.fixture
+def jobs_client(client, api_module, monkeypatch):
+    monkeypatch.setattr(api_module, 'job_manager', JobManager(max_workers=1))
+    return client
+
+
+def test_run_model_job_result_is_served_from_the_registry(jobs_client, dataset_id):
+    response = jobs_client.post('/api/jobs', json={'type': 'run-model',
+                                                   'params': {'datasetId': dataset_id, 'clusters': 3}})
+    assert response.status_code == 202
+    job_id = response.json['jobId']
+    assert _wait(lambda: jobs_client.get(f'/api/jobs/{job_id}').json['status']) == SUCCEEDED
+
+    result = jobs_client.get(f'/api/jobs/{job_id}/result').json
+    direct = jobs_client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 3}).json
+    assert result['modelInfo']['modelId'] == direct['modelInfo']['modelId']
+    assert len(result['customers']) == 500
+
+
+def test_job_errors_are_reported(jobs_client):
+    assert jobs_client.post('/api/jobs', json={'type': 'nope'}).status_code == 400
+    assert jobs_client.get('/api/jobs/missing').status_code == 404
+    job_id = jobs_client.post('/api/jobs', json={'type': 'run-model',
+                                                 'params': {'datasetId': 'missing'}}).json['jobId']
+    assert _wait(lambda: jobs_client.get(f'/api/jobs/{job_id}').json['status']) == FAILED
+    assert jobs_client.get(f'/api/jobs/{job_id}/result').status_code == 409
@@ -0,0 +1,50 @@
+import numpy as np
+
+from lod import stratified_sample, grid_aggregate, in_bbox
+
+
+def test_stratified_sample_keeps_proportions_and_outliers():
+    labels = np.repeat([0, 1], [900, 100])
+    distances = np.arange(1000, dtype=float)
+    picked = stratified_sample(labels, distances, budget=100)
+    assert np.bincount(labels[picked]).tolist() == [90, 10]
+    assert len(np.unique(picked)) == len(picked)
+    # The farthest rows of each cluster are always kept
+    assert 899 in picked and 999 in picked
+
+
+def test_stratified_sample_keeps_every_row_under_budget():
+    labels = np.array([0, 1, 1, 2])
+    assert stratified_sample(labels, np.zeros(4), budget=10).tolist() == [0, 1, 2, 3]
+
+
+def test_grid_aggregate_counts_every_row_once():
+    rng = np.random.RandomState(0)
+    coords = rng.rand(5000, 2)
+    labels = rng.randint(0, 3, 5000)
+    cells = grid_aggregate(coords, labels, budget=300)
+    assert cells["count"].sum() == 5000
+    assert len(cells["count"]) <= 300
+    assert np.bincount(cells["cluster"], weights=cells["count"]).tolist() == np.bincount(labels).tolist()
+
+
+def test_in_bbox():
+    coords = np.array([[10.0, 50.0, 30.0], [80.0, 20.0, 60.0]])
+    assert in_bbox(coords, None).tolist() == [True, True]
+    assert in_bbox(coords, [0, 40, 50, 60]).tolist() == [True, False]
+    assert in_bbox(coords, [0, 0, 50, 100, 100, 70]).tolist() == [False, True]
+
+
+def test_points_endpoint_stays_within_budget(client, dataset_id):
+    assert client.post('/api/run-model', json={'datasetId': dataset_id}).status_code == 200
+    sample = client.get('/api/points?budget=50').json
+    assert sample['total'] == 500
+    assert sample['returned'] <= 55
+    assert len(sample['points']['customerId']) == sample['returned']
+
+    grid = client.get('/api/points?mode=grid&budget=40').json
+    assert sum(grid['points']['count']) == 500
+
+    inside = client.get('/api/points?bbox=0,0,60,100').json
+    assert all(income <= 60 for income in inside['points']['annualIncome'])
+    assert client.get('/api/points?budget=0').status_code == 400
@@ -0,0 +1,14 @@
+def test_optimal_k_with_default_parameters(client, dataset_id):
+    response = client.get('/api/optimal-k')
+    assert response.status_code == 200, response.json
+    assert response.json['k_values'] == list(range(2, 11))
+    assert len(response.json['inertia_values']) == len(response.json['silhouette_values']) == 9
+    assert response.json['recommended_k'] in response.json['k_values']
+
+
+def test_optimal_k_on_the_sample_data(client):
+    assert client.get('/api/optimal-k?kMax=4').status_code == 200
+
+
+def test_optimal_k_rejects_the_streaming_algorithm(client, dataset_id):
+    assert client.get('/api/optimal-k?algorithm=minibatch').status_code == 400
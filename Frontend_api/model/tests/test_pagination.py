@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def model_id(client, dataset_id):
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'clusters': 4})
+    return response.json['modelInfo']['modelId']
+
+
+@pytest.fixture
+def streaming_model_id(client, dataset_id):
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'algorithm': 'minibatch',
+                                                   'chunkSize': 100, 'clusters': 4})
+    assert response.status_code == 200, response.json
+    return response.json['modelInfo']['modelId']
+
+
+def test_cursor_pages_cover_every_customer_once(client, model_id):
+    seen, cursor = [], None
+    while True:
+        url = f'/api/segmentation/customers?modelId={model_id}&limit=120' + (f'&cursor={cursor}' if cursor else '')
+        page = client.get(url).json
+        assert page['total'] == 500
+        seen.extend(customer['customerId'] for customer in page['customers'])
+        cursor = page['nextCursor']
+        if cursor is None:
+            break
+    assert sorted(seen) == list(range(1, 501))
+
+
+def test_cluster_pages_only_hold_that_cluster(client, model_id):
+    page = client.get(f'/api/segmentation/customers?modelId={model_id}&cluster=2&limit=10000&format=columnar').json
+    assert set(page['customers']['cluster']) == {2}
+    assert page['nextCursor'] is None
+
+
+def test_ndjson_streams_one_customer_per_line(client, model_id):
+    response = client.get(f'/api/segmentation?modelId={model_id}&format=ndjson&chunkSize=64')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == 500
+    assert [json.loads(line)['customerId'] for line in lines] == list(range(1, 501))
+
+
+@pytest.mark.parametrize('chunk_size', [0, -5])
+def test_ndjson_rejects_empty_chunks(client, model_id, chunk_size):
+    response = client.get(f'/api/segmentation?modelId={model_id}&format=ndjson&chunkSize={chunk_size}')
+    assert response.status_code == 400
+
+
+def test_streaming_runs_reject_customer_rows_up_front(client, streaming_model_id):
+    response = client.get(f'/api/segmentation?modelId={streaming_model_id}&format=ndjson')
+    assert response.status_code == 400
+    assert 'minibatch' in response.json['error']
+    response = client.get(f'/api/segmentation/customers?modelId={streaming_model_id}')
+    assert response.status_code == 400
+    assert 'minibatch' in response.json['error']
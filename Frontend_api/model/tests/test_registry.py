@@ -0,0 +1,65 @@
+from registry import ModelRegistry, MAX_PLOTS_PER_MODEL
+
+
+class FakeModel:
+    def __init__(self, size):
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+
+def test_evicts_least_recently_used_beyond_max_entries():
+    registry = ModelRegistry(max_entries=2)
+    for model_id in ('a', 'b'):
+        registry.put(model_id, FakeModel(0), {}, 'data.csv')
+    registry.get('a')
+    registry.put('c', FakeModel(0), {}, 'data.csv')
+    assert registry.get('b') is None
+    assert registry.get('a') is not None and registry.get('c') is not None
+
+
+def test_evicts_beyond_max_bytes():
+    registry = ModelRegistry(max_entries=10, max_bytes=1000)
+    registry.put('a', FakeModel(400), {}, 'data.csv')
+    registry.put('b', FakeModel(400), {}, 'data.csv')
+    registry.put('c', FakeModel(400), {}, 'data.csv')
+    assert registry.get('a') is None
+    assert registry.memory_usage() == 800
+
+
+def test_newest_entry_is_kept_even_over_budget():
+    registry = ModelRegistry(max_bytes=100)
+    registry.put('a', FakeModel(50), {}, 'data.csv')
+    registry.put('b', FakeModel(500), {}, 'data.csv')
+    assert registry.get('a') is None
+    assert registry.get('b') is not None
+
+
+def test_cached_bodies_count_towards_the_budget():
+    registry = ModelRegistry(max_entries=10, max_bytes=1000)
+    registry.put('a', FakeModel(300), {}, 'data.csv')
+    entry = registry.put('b', FakeModel(300), {}, 'data.csv')
+    entry.add_body('rows', b'x' * 500)
+    assert entry.size == 800
+    assert registry.get('a') is None
+
+
+def test_model_growth_is_picked_up_by_refresh():
+    registry = ModelRegistry(max_entries=10, max_bytes=1000)
+    registry.put('a', FakeModel(300), {}, 'data.csv')
+    entry = registry.put('b', FakeModel(300), {}, 'data.csv')
+    entry.model.size = 900
+    assert registry.memory_usage() == 600
+    entry.refresh()
+    assert registry.get('a') is None
+
+
+def test_plots_are_capped_per_model():
+    registry = ModelRegistry()
+    entry = registry.put('a', FakeModel(0), {}, 'data.csv')
+    for key in range(MAX_PLOTS_PER_MODEL + 3):
+        entry.add_plot(key, b'png')
+    assert len(entry.plots) == MAX_PLOTS_PER_MODEL
+    assert entry.get_plot(0) is None
+    assert entry.get_plot(MAX_PLOTS_PER_MODEL + 2) == b'png'
@@ -0,0 +1,22 @@
+def test_run_model_repeats_are_served_from_the_cache_with_an_etag(client, dataset_id):
+    body = {'datasetId': dataset_id, 'clusters': 4}
+    first = client.post('/api/run-model', json=body)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    model_id = first.json['modelInfo']['modelId']
+
+    second = client.post('/api/run-model', json=body)
+    assert second.status_code == 200
+    assert second.headers['ETag'] == etag
+    assert second.get_data() == first.get_data()
+
+    cached = client.post('/api/run-model', json=body, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.get_data() == b''
+
+    # A different response format is a different body, so the old tag does not match it
+    columnar = client.post('/api/run-model', json={**body, 'format': 'columnar'}, headers={'If-None-Match': etag})
+    assert columnar.status_code == 200
+    assert columnar.headers['ETag'] != etag
+    assert columnar.json['modelInfo']['modelId'] == model_id
+
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from schema import ColumnRoles
+from mall_segmentation import MallCustomerSegmentation, _default_features
+
+
+def test_roles_resolve_exact_names_then_keywords():
+    roles = ColumnRoles.resolve(['CustomerID', 'Gender', 'Age', 'Annual Income (k$)', 'Spending Score (1-100)'])
+    assert (roles.id, roles.income, roles.spending) == ('CustomerID', 'Annual Income (k$)', 'Spending Score (1-100)')
+    roles = ColumnRoles.resolve(['customer_id', 'household_income', 'monthly_spend'])
+    assert (roles.income, roles.spending, roles.age) == ('household_income', 'monthly_spend', None)
+
+
+def test_default_features_follow_the_roles():
+    df = pd.DataFrame({'customer_id': [1, 2], 'age': [30, 40], 'household_income': [50, 60],
+                       'monthly_spend': [10, 20]})
+    assert _default_features(df) == ['household_income', 'monthly_spend']
+    # Without income and spending roles every non-id numeric column is used
+    df = pd.DataFrame({'customer_id': [1, 2], 'x': [1.0, 2.0], 'y': [3, 4], 'label': ['a', 'b']})
+    assert _default_features(df) == ['x', 'y']
+
+
+def test_get_cluster_description_uses_the_income_and_spending_means(tmp_path):
+    path = tmp_path / 'customers.csv'
+    pd.DataFrame({'CustomerID': np.arange(1, 5), 'Annual Income (k$)': [90, 100, 20, 30],
+                  'Spending Score (1-100)': [80, 90, 10, 20]}).to_csv(path, index=False)
+    model = MallCustomerSegmentation(n_clusters=2)
+    model.load_data(str(path))
+    assert model.get_cluster_description(model.df.iloc[:2]) == model._describe_levels(95, 85)
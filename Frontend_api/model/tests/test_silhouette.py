@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_score
+
+from silhouette import compute_silhouette, silhouette_scores
+
+
+@pytest.fixture
+def blobs():
+    X, labels = make_blobs(n_samples=600, centers=4, n_features=3, random_state=0)
+    return X, labels
+
+
+def test_exact_silhouette_matches_sklearn(blobs):
+    X, labels = blobs
+    assert compute_silhouette(X, labels, sample_size=None) == pytest.approx(silhouette_score(X, labels), abs=1e-9)
+
+
+def test_silhouette_scores_match_sklearn_per_labeling(blobs):
+    X, labels = blobs
+    shuffled = np.random.RandomState(1).permutation(labels)
+    labelings = [labels, shuffled, labels % 2]
+    scores = silhouette_scores(X, labelings)
+    assert scores == pytest.approx([silhouette_score(X, labeling) for labeling in labelings], abs=1e-9)
+
+
+def test_single_cluster_scores_zero(blobs):
+    X, _ = blobs
+    assert compute_silhouette(X, np.zeros(len(X), dtype=int), sample_size=None) == 0.0
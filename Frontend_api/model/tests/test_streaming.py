@@ -0,0 +1,46 @@
+import io
+
+import pandas as pd
+import pytest
+
+from mall_segmentation import MallCustomerSegmentation
+from synthetic import generate_customers
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'customers.csv'
+    generate_customers(1000, random_state=0).to_csv(path, index=False)
+    return str(path)
+
+
+def test_streaming_fit_labels_every_row_without_loading_the_file(data_file, tmp_path):
+    model = MallCustomerSegmentation(n_clusters=4, algorithm='minibatch')
+    labels_path = model.fit_streaming(data_file, chunk_size=150, n_passes=2, output_path=str(tmp_path / 'labels.csv'))
+    assert model.df is None
+
+    labelled = pd.read_csv(labels_path)
+    assert len(labelled) == 1000
+    assert labelled['CustomerID'].tolist() == list(range(1, 1001))
+    assert set(labelled['Cluster']) <= set(range(4))
+
+    results = model.get_results()
+    assert results['customers'] == []
+    assert results['modelInfo']['rows'] == 1000
+    assert -1 <= results['modelInfo']['silhouetteScore'] <= 1
+
+
+def test_streaming_fit_defaults_its_output_next_to_the_data(data_file):
+    model = MallCustomerSegmentation(n_clusters=3, algorithm='minibatch')
+    assert model.fit_streaming(data_file, chunk_size=400).endswith('customers_segmented.csv')
+
+
+def test_streaming_run_through_the_api_exports_its_labels(client, dataset_id):
+    response = client.post('/api/run-model', json={'datasetId': dataset_id, 'algorithm': 'minibatch', 'chunkSize': 120})
+    assert response.status_code == 200, response.json
+    model_id = response.json['modelInfo']['modelId']
+    assert response.json['modelInfo']['labelsFile'] == f'segmented_{model_id}.csv'
+
+    exported = pd.read_csv(io.BytesIO(client.get(f'/api/export-csv?modelId={model_id}').data))
+    assert len(exported) == 500
+    assert 'Cluster' in exported.columns
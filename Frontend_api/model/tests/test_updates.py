@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from mall_segmentation import MallCustomerSegmentation
+from synthetic import generate_customers
+
+
+@pytest.fixture
+def fitted(tmp_path):
+    data_file = tmp_path / 'customers.csv'
+    generate_customers(400, random_state=0).to_csv(data_file, index=False)
+    model = MallCustomerSegmentation(n_clusters=4)
+    model.load_data(str(data_file))
+    model.fit()
+    return model
+
+
+def new_customers(n, start_id=1001):
+    return generate_customers(n, random_state=1, start_id=start_id)
+
+
+def test_partial_update_appends_rows_and_moves_centroids(fitted):
+    centers = fitted.model.cluster_centers_.copy()
+    report = fitted.partial_update(new_customers(20), size_threshold=1.0, inertia_threshold=100.0)
+    assert report["rowsAdded"] == 20 and report["rows"] == 420 and not report["refit"]
+    assert sum(report["clusterSizes"]) == 420
+    assert fitted.df['Cluster'].notna().all()
+    assert not np.allclose(fitted.model.cluster_centers_, centers)
+
+
+def test_partial_update_refits_past_the_threshold(fitted):
+    assert fitted.partial_update(new_customers(200), size_threshold=0.0)["refit"]
+    assert len(fitted.model.labels_) == 600
+
+
+def test_partial_update_rejects_missing_features(fitted):
+    rows = new_customers(5).drop(columns=['Spending Score (1-100)'])
+    with pytest.raises(ValueError, match='Missing feature columns'):
+        fitted.partial_update(rows)
+
+
+def test_updating_a_copy_leaves_the_original_untouched(fitted):
+    centers = fitted.model.cluster_centers_.copy()
+    mean = fitted.scaler.mean_.copy()
+    seen = np.array(fitted.scaler.n_samples_seen_, copy=True)
+    baseline = dict(fitted._drift_baseline)
+
+    updated = fitted.copy()
+    updated.partial_update(new_customers(30), size_threshold=1.0, inertia_threshold=100.0)
+
+    assert len(fitted.df) == 400 and len(updated.df) == 430
+    np.testing.assert_array_equal(fitted.model.cluster_centers_, centers)
+    np.testing.assert_array_equal(fitted.scaler.mean_, mean)
+    np.testing.assert_array_equal(fitted.scaler.n_samples_seen_, seen)
+    assert fitted._drift_baseline == baseline
+
+
+def test_updates_of_the_same_base_do_not_stack(api_module, client, dataset_id):
+    model_id = client.post('/api/run-model', json={'datasetId': dataset_id}).json['modelInfo']['modelId']
+    base = api_module.registry.get(model_id)
+    rows = new_customers(10).to_dict(orient='records')
+
+    first = client.post(f'/api/update-model?modelId={model_id}&sizeThreshold=1&inertiaThreshold=100', json={'rows': rows})
+    assert first.status_code == 200, first.json
+    assert first.json['rows'] == 510
+    assert len(base.model.df) == 500
+
+    # The base was replaced in memory by its update, but another update of it still starts from 500 rows
+    delta_file = api_module.registry.get(first.json['modelId']).params['updates'][-1]['file']
+    _, report = api_module.apply_update(base, delta_file, 1.0, 100.0)
+    assert report['rows'] == 510
+    assert len(base.model.df) == 500